@@ -0,0 +1,89 @@
+"""add lookup indexes and constraints
+
+Brings databases created before these indexes were declared on the models
+up to date; create_all is skipped once the schema exists. Every statement
+is IF NOT EXISTS, so it is also safe on a database create_all just built.
+
+Indexes are built CONCURRENTLY so live traffic keeps writing meanwhile.
+uq_server_endpoint_port fails if two servers already share an endpoint
+and port; resolve those by hand and rerun.
+
+Revision ID: b7d2f0c41e9a
+Revises: 
+Create Date: 2026-10-15 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b7d2f0c41e9a'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_server_name_trgm", "servers USING gin (name gin_trgm_ops)"),
+    ("ix_server_location_trgm", "servers USING gin (location gin_trgm_ops)"),
+    ("ix_server_endpoint_trgm", "servers USING gin (endpoint gin_trgm_ops)"),
+    ("ix_vpn_configs_user_id", "vpn_configs (user_id)"),
+    ("ix_vpn_configs_server_id", "vpn_configs (server_id)"),
+    ("ix_vpnconfig_user_active", "vpn_configs (user_id, id) WHERE is_active"),
+    ("ix_vpnconfig_server_active", "vpn_configs (server_id, is_active)"),
+    ("ix_vpnconfig_public_key_active", "vpn_configs (public_key) WHERE is_active"),
+    ("ix_usage_logs_user_id", "usage_logs (user_id)"),
+    ("ix_usage_logs_vpn_config_id", "usage_logs (vpn_config_id)"),
+    ("ix_usagelog_user_session", "usage_logs (user_id, session_start)"),
+    ("ix_usagelog_session_id", "usage_logs (session_start, id)"),
+    ("ix_ip_allocations_server_id", "ip_allocations (server_id)"),
+    ("ix_ip_allocations_allocated_to", "ip_allocations (allocated_to)"),
+    ("ix_ipalloc_server_free", "ip_allocations (server_id, is_allocated)"),
+]
+
+UNIQUE_INDEXES = [
+    ("ux_vpnconfig_active_user_server", "vpn_configs (user_id, server_id) WHERE is_active"),
+    ("uq_server_endpoint_port", "servers (endpoint, port)"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Keep only the newest live record per user and server, freeing the
+    # addresses of the rest, so the unique index below can be built
+    op.execute("""
+        WITH ranked AS (
+            SELECT id, row_number() OVER (PARTITION BY user_id, server_id ORDER BY id DESC) AS position
+            FROM vpn_configs
+            WHERE is_active
+        ), stale AS (
+            UPDATE vpn_configs SET is_active = false
+            WHERE id IN (SELECT id FROM ranked WHERE position > 1)
+            RETURNING id
+        )
+        UPDATE ip_allocations SET is_allocated = false, allocated_to = NULL
+        WHERE allocated_to IN (SELECT id FROM stale)
+    """)
+
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+        for name, definition in UNIQUE_INDEXES:
+            op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+    # create_all declares this one as a constraint; attach the index the same way
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_server_endpoint_port') THEN
+                ALTER TABLE servers ADD CONSTRAINT uq_server_endpoint_port UNIQUE USING INDEX uq_server_endpoint_port;
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE servers DROP CONSTRAINT IF EXISTS uq_server_endpoint_port")
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES + UNIQUE_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -1,9 +1,27 @@
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from config import settings
 from fastapi import HTTPException, status
 
+VERIFIED_TOKEN_CACHE_SIZE = 10000
+
+# sha256(token) -> (username, exp) for signatures already checked in this process;
+# digests so raw bearer tokens aren't kept in memory
+_verified_tokens: Dict[bytes, Tuple[str, float]] = {}
+_verified_tokens_lock = threading.Lock()
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def forget_verified_token(token: str):
+    """Drop a logged-out token so it isn't kept until it expires"""
+    with _verified_tokens_lock:
+        _verified_tokens.pop(_token_digest(token), None)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -14,7 +32,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def token_seconds_remaining(token: str) -> int:
+    """Lifetime left on an already-verified token, in whole seconds"""
+    expire = jwt.get_unverified_claims(token).get("exp")
+    if expire is None:
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    return max(int(expire - time.time()), 0)
+
 def verify_token(token: str):
+    # A token's claims never change, so polling clients skip the signature
+    # check until it expires; revocation is still checked by the caller
+    digest = _token_digest(token)
+    cached = _verified_tokens.get(digest)
+    if cached is not None:
+        if time.time() < cached[1]:
+            return cached[0]
+        with _verified_tokens_lock:
+            _verified_tokens.pop(digest, None)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
@@ -24,6 +59,16 @@ def verify_token(token: str):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        expire = payload.get("exp")
+        if expire is not None:
+            with _verified_tokens_lock:
+                # Dicts keep insertion order and tokens share one lifetime, so the
+                # first entry is the next to expire; drop it if it has, or if full
+                if _verified_tokens:
+                    oldest = next(iter(_verified_tokens))
+                    if _verified_tokens[oldest][1] <= time.time() or len(_verified_tokens) >= VERIFIED_TOKEN_CACHE_SIZE:
+                        del _verified_tokens[oldest]
+                _verified_tokens[digest] = (username, expire)
         return username
     except JWTError:
         raise HTTPException(
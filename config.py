@@ -1,35 +1,54 @@
-from pydantic_settings import BaseSettings
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
-import os
+from functools import lru_cache, cached_property
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, extra="ignore")
+
     # Database Configuration
-    POSTGRES_USER: str = os.getenv("DB_USER", "postgres")
-    POSTGRES_PASSWORD: str = os.getenv("DB_PASSWORD", "123")
-    POSTGRES_SERVER: str = os.getenv("DB_HOST", "localhost")
-    POSTGRES_PORT: str = os.getenv("DB_PORT", "5432")
-    POSTGRES_DB: str = os.getenv("DB_NAME", "vpn_db")
-    
-    @property
+    POSTGRES_USER: str = Field("postgres", validation_alias=AliasChoices("DB_USER", "POSTGRES_USER"))
+    POSTGRES_PASSWORD: str = Field("123", validation_alias=AliasChoices("DB_PASSWORD", "POSTGRES_PASSWORD"))
+    POSTGRES_SERVER: str = Field("localhost", validation_alias=AliasChoices("DB_HOST", "POSTGRES_SERVER"))
+    POSTGRES_PORT: str = Field("5432", validation_alias=AliasChoices("DB_PORT", "POSTGRES_PORT"))
+    POSTGRES_DB: str = Field("vpn_db", validation_alias=AliasChoices("DB_NAME", "POSTGRES_DB"))
+    SKIP_CREATE_ALL: bool = False
+    # Connections held per worker process: DB_POOL_SIZE + DB_MAX_OVERFLOW at peak
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    # Seconds a request waits for a free connection before failing fast
+    DB_POOL_TIMEOUT: int = 30
+    # Set when connecting through PgBouncer (transaction mode); it does the pooling
+    DB_EXTERNAL_POOLER: bool = False
+    # Worker threads for sync handlers and run_in_threadpool DB calls; each
+    # holds at most one pooled connection, so match DB_POOL_SIZE + DB_MAX_OVERFLOW
+    THREADPOOL_SIZE: int = 50
+    
+    @cached_property
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
     # Authentication
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "asassa")
+    SECRET_KEY: str = "asassa"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "300"))
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 300
+    # bcrypt cost factor; each +1 doubles hashing time on register/login
+    BCRYPT_ROUNDS: int = 12
 
     # WG-Easy Configuration
-    WG_EASY_PANEL_URL: str = os.getenv("WG_EASY_PANEL_URL", "http://74.208.112.39:51821")
-    WG_EASY_PASSWORD: str = os.getenv("WG_EASY_PASSWORD", "123456789")
-    WG_EASY_USERNAME: str = os.getenv("WG_EASY_USERNAME", "admin")
+    WG_EASY_PANEL_URL: str = "http://74.208.112.39:51821"
+    WG_EASY_PASSWORD: str = "123456789"
+    WG_EASY_USERNAME: str = "admin"
+    # Panel connections opened at startup; 0 disables warm-up
+    WG_EASY_WARM_CONNECTIONS: int = 5
     
     # Dynamic Tunnel Management
-    ENABLE_DYNAMIC_TUNNELS: bool = os.getenv("ENABLE_DYNAMIC_TUNNELS", "true").lower() == "true"
-    MAX_TUNNELS_PER_USER: int = int(os.getenv("MAX_TUNNELS_PER_USER", "1"))
-    TUNNEL_AUTO_CLEANUP: bool = os.getenv("TUNNEL_AUTO_CLEANUP", "true").lower() == "true"
-    TUNNEL_CLEANUP_DELAY: int = int(os.getenv("TUNNEL_CLEANUP_DELAY", "300"))
-    TUNNEL_IDLE_TIMEOUT: int = int(os.getenv("TUNNEL_IDLE_TIMEOUT", "3600"))
+    ENABLE_DYNAMIC_TUNNELS: bool = True
+    MAX_TUNNELS_PER_USER: int = 1
+    TUNNEL_AUTO_CLEANUP: bool = True
+    TUNNEL_CLEANUP_DELAY: int = 300
+    TUNNEL_IDLE_TIMEOUT: int = 3600
     
     # Legacy WireGuard Configuration
     WIREGUARD_CONFIG_PATH: str = "/etc/wireguard"
@@ -38,29 +57,44 @@ class Settings(BaseSettings):
     VPN_DNS: str = "1.1.1.1"
     
     # Server Configuration
-    HOST: str = os.getenv("HOST", "0.0.0.0")
-    PORT: int = int(os.getenv("PORT", "8002"))
-    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    HOST: str = "0.0.0.0"
+    PORT: int = 8002
+    WORKERS: int = 1
+    DEBUG: bool = False
     
     # Logging Configuration
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    LOG_FILE: Optional[str] = os.getenv("LOG_FILE", None)
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: Optional[str] = None
     
     # Security Configuration
-    CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "*")
-    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
-    RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
-    RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))
+    CORS_ORIGINS: str = "*"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REQUESTS: int = 100
+    RATE_LIMIT_WINDOW: int = 3600
     
     # Monitoring Configuration
-    ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "true").lower() == "true"
-    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9090"))
-    HEALTH_CHECK_INTERVAL: int = int(os.getenv("HEALTH_CHECK_INTERVAL", "60"))
+    ENABLE_METRICS: bool = True
+    METRICS_PORT: int = 9090
+    HEALTH_CHECK_INTERVAL: int = 60
+    
+    # Cache Configuration (caching is disabled when REDIS_URL is unset)
+    REDIS_URL: Optional[str] = None
+    USER_INFO_CACHE_TTL: int = 30
+    USER_CACHE_TTL: int = 60
+    CONNECTION_STATS_CACHE_TTL: int = 10
+    PANEL_STATUS_CACHE_TTL: int = 60
+    SERVER_LIST_CACHE_TTL: int = 300
+    # Shared across workers so status polls don't each run `wg show`
+    PEER_STATUS_CACHE_TTL: int = 3
+    QR_CODE_CACHE_TTL: int = 30 * 24 * 3600
+    # In-process, per worker; seconds
+    VPN_STATUS_CACHE_TTL: float = 3.0
+    TUNNEL_LIST_CACHE_TTL: float = 15.0
     
     # Background Tasks Configuration
-    ENABLE_BACKGROUND_TASKS: bool = os.getenv("ENABLE_BACKGROUND_TASKS", "true").lower() == "true"
-    CLEANUP_TASK_INTERVAL: int = int(os.getenv("CLEANUP_TASK_INTERVAL", "300"))
-    STATS_UPDATE_INTERVAL: int = int(os.getenv("STATS_UPDATE_INTERVAL", "60"))
+    ENABLE_BACKGROUND_TASKS: bool = True
+    CLEANUP_TASK_INTERVAL: int = 300
+    STATS_UPDATE_INTERVAL: int = 60
     
     # API Configuration
     API_VERSION: str = "v1"
@@ -68,25 +102,33 @@ class Settings(BaseSettings):
     REDOC_URL: Optional[str] = "/redoc"
     
     # WebSocket Configuration
-    ENABLE_WEBSOCKET: bool = os.getenv("ENABLE_WEBSOCKET", "false").lower() == "true"
+    ENABLE_WEBSOCKET: bool = False
     WEBSOCKET_PATH: str = "/ws"
     
     # Backup Configuration
-    ENABLE_AUTO_BACKUP: bool = os.getenv("ENABLE_AUTO_BACKUP", "false").lower() == "true"
-    BACKUP_INTERVAL: int = int(os.getenv("BACKUP_INTERVAL", "86400"))
-    BACKUP_PATH: str = os.getenv("BACKUP_PATH", "/var/backups/vpn")
-    
-    @property
-    def CORS_ORIGINS_LIST(self) -> list:
-        if self.CORS_ORIGINS == "*":
-            return ["*"]
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    ENABLE_AUTO_BACKUP: bool = False
+    BACKUP_INTERVAL: int = 86400
+    BACKUP_PATH: str = "/var/backups/vpn"
+    
+    @cached_property
+    def CORS_ORIGINS_LIST(self) -> tuple:
+        origins = self.CORS_ORIGINS.strip()
+        if origins == "*":
+            return ("*",)
+        return tuple(origin.strip() for origin in origins.split(",") if origin.strip())
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
 
-settings = Settings()
+settings = get_settings()
+
+_WEAK_SECRETS = frozenset({
+    "",
+    "asassa",
+    "changeme",
+    "your-secret-key-change-this-in-production",
+})
 
 def validate_config():
     errors = []
@@ -101,9 +143,15 @@ def validate_config():
                 settings.POSTGRES_SERVER, settings.POSTGRES_DB]):
         errors.append("Database configuration is incomplete")
     
-    if settings.SECRET_KEY == "your-secret-key-change-this-in-production":
+    if settings.SECRET_KEY in _WEAK_SECRETS:
         errors.append("SECRET_KEY must be changed from default value")
     
+    if not 4 <= settings.BCRYPT_ROUNDS <= 31:
+        errors.append("BCRYPT_ROUNDS must be between 4 and 31")
+    
+    if settings.THREADPOOL_SIZE < 1:
+        errors.append("THREADPOOL_SIZE must be at least 1")
+    
     if errors:
         raise ValueError(f"Configuration errors: {', '.join(errors)}")
     
@@ -115,7 +163,11 @@ def get_config_summary():
             "host": settings.POSTGRES_SERVER,
             "port": settings.POSTGRES_PORT,
             "database": settings.POSTGRES_DB,
-            "user": settings.POSTGRES_USER
+            "user": settings.POSTGRES_USER,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "external_pooler": settings.DB_EXTERNAL_POOLER,
+            "threadpool_size": settings.THREADPOOL_SIZE
         },
         "wg_easy": {
             "panel_url": settings.WG_EASY_PANEL_URL,
@@ -1,42 +1,42 @@
 #!/usr/bin/env python3
 
 import sys
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
 from models import User
 from auth.password import hash_password
 from config import settings
 
 def create_admin_user(username="admin", email="admin@vpn.com", password="admin123"):
+    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_size=1)
     try:
-        engine = create_engine(settings.DATABASE_URL)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
-        
-        existing_user = db.query(User).filter(User.username == username).first()
-        if existing_user:
-            if existing_user.is_admin:
-                print(f"✅ Admin user '{username}' already exists")
-                db.close()
-                return True
-            else:
-                existing_user.is_admin = True
-                db.commit()
-                print(f"✅ User '{username}' upgraded to admin")
-                db.close()
+        with Session(engine) as db, db.begin():
+            existing_user = db.execute(select(User.is_admin).where(User.username == username)).first()
+            if existing_user:
+                if not existing_user.is_admin:
+                    db.execute(update(User).where(User.username == username).values(is_admin=True))
+                    print(f"✅ User '{username}' upgraded to admin")
+                else:
+                    print(f"✅ Admin user '{username}' already exists")
                 return True
+            
+            stmt = insert(User).values(
+                username=username,
+                email=email,
+                hashed_password=hash_password(password),
+                is_admin=True,
+                is_active=True
+            ).on_conflict_do_update(
+                index_elements=[User.username],
+                set_={"is_admin": True}
+            ).returning(User.id, literal_column("xmax = 0").label("inserted"))
+            
+            result = db.execute(stmt).one()
         
-        admin_user = User(
-            username=username,
-            email=email,
-            hashed_password=hash_password(password),
-            is_admin=True,
-            is_active=True
-        )
-        
-        db.add(admin_user)
-        db.commit()
-        db.close()
+        if not result.inserted:
+            print(f"✅ User '{username}' already exists and has admin rights")
+            return True
         
         print(f"✅ Admin user created successfully!")
         print(f"   Username: {username}")
@@ -50,6 +50,8 @@ def create_admin_user(username="admin", email="admin@vpn.com", password="admin12
     except Exception as e:
         print(f"❌ Error creating admin user: {e}")
         return False
+    finally:
+        engine.dispose()
 
 def create_custom_admin():
     print("=== Create Custom Admin User ===")
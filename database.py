@@ -1,13 +1,39 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+if settings.DB_EXTERNAL_POOLER:
+    # Pooling on both sides would pin idle server connections; let PgBouncer own them
+    engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+else:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        # Reuse the most recently returned connection so surplus ones go idle
+        # and get recycled instead of being kept warm round-robin
+        pool_use_lifo=True
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def ping_database():
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+def schema_exists(metadata) -> bool:
+    with engine.connect() as connection:
+        return bool(connection.execute(
+            text("SELECT bool_and(to_regclass(name) IS NOT NULL) FROM unnest(CAST(:names AS text[])) AS name"),
+            {"names": list(metadata.tables)}
+        ).scalar())
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,16 +1,60 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Optional, Tuple
 from database import get_db
 from models import User
 from auth.jwt_handler import verify_token
+from config import settings
+from utils.cache import cache, user_key, revoked_token_key
+from utils.wg_panel_manager import WgEasyManager, DynamicTunnelManager
 
 security = HTTPBearer()
 
+def _user_to_cache(user: User) -> dict:
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "is_active": user.is_active,
+        "is_admin": user.is_admin,
+        "created_at": user.created_at.isoformat() if user.created_at else None
+    }
+
+def _user_from_cache(data: dict) -> User:
+    # Detached instance carrying only the column values handlers read
+    created_at = data["created_at"]
+    return User(
+        id=data["id"],
+        username=data["username"],
+        email=data["email"],
+        is_active=data["is_active"],
+        is_admin=data["is_admin"],
+        created_at=datetime.fromisoformat(created_at) if created_at else None
+    )
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     token = credentials.credentials
     username = verify_token(token)
-    user = db.query(User).filter(User.username == username).first()
+    
+    # One Redis round-trip answers both "was this token logged out?" and
+    # "who is this user?"; the DB is only hit on a cache miss
+    revoked, cached_user = cache.get_many_json(revoked_token_key(token), user_key(username))
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if cached_user is not None:
+        user = _user_from_cache(cached_user)
+    else:
+        user = db.query(User).filter(User.username == username).first()
+        if user is not None:
+            cache.set_json(user_key(username), _user_to_cache(user), settings.USER_CACHE_TTL)
+    
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,4 +74,19 @@ def get_admin_user(current_user: User = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+# Both are created once in the app lifespan so every request shares the
+# same panel session and in-memory tunnel registry
+def get_wg_easy_manager(request: Request) -> WgEasyManager:
+    return request.app.state.wg_easy_manager
+
+def get_tunnel_manager(request: Request) -> DynamicTunnelManager:
+    return request.app.state.tunnel_manager
+
+async def get_current_tunnel(
+    current_user: User = Depends(get_current_user),
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager)
+) -> Tuple[bool, Optional[Dict], str]:
+    """(has_tunnel, tunnel_info, message) for the caller; resolved once per request"""
+    return await tunnel_manager.get_user_tunnel_status(current_user.id)
@@ -1,16 +1,34 @@
 from fastapi import HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError, DatabaseError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import logging
-from datetime import datetime
+from types import MappingProxyType
 from typing import Union, Dict, Any, List
+from utils.timestamps import utc_now_iso
 
 logger = logging.getLogger(__name__)
 
+STATUS_CODE_MAP = MappingProxyType({
+    "AUTH_ERROR": 401,
+    "AUTHORIZATION_ERROR": 403,
+    "VALIDATION_ERROR": 400,
+    "RESOURCE_NOT_FOUND": 404,
+    "RESOURCE_CONFLICT": 409,
+    "SERVER_ERROR": 500,
+    "PANEL_ERROR": 502,
+    "VPN_CONNECTION_ERROR": 503,
+    "DATABASE_ERROR": 500,
+    "RATE_LIMIT_ERROR": 429
+})
+
+_NO_ERRORS = ()
+
 class VPNException(Exception):
+    __slots__ = ("message", "code", "details")
+    
     def __init__(self, message: str, code: str = "VPN_ERROR", details: Dict[str, Any] = None):
         self.message = message
         self.code = code
@@ -18,19 +36,27 @@ class VPNException(Exception):
         super().__init__(self.message)
 
 class AuthenticationError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str = "Authentication failed"):
         super().__init__(message, "AUTH_ERROR")
 
 class AuthorizationError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str = "Insufficient permissions"):
         super().__init__(message, "AUTHORIZATION_ERROR")
 
 class ValidationError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str, field: str = None):
         details = {"field": field} if field else {}
         super().__init__(message, "VALIDATION_ERROR", details)
 
 class ResourceNotFoundError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, resource: str, resource_id: Union[int, str] = None):
         message = f"{resource} not found"
         if resource_id:
@@ -38,26 +64,38 @@ class ResourceNotFoundError(VPNException):
         super().__init__(message, "RESOURCE_NOT_FOUND", {"resource": resource, "id": resource_id})
 
 class ResourceConflictError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str, resource: str = None):
         super().__init__(message, "RESOURCE_CONFLICT", {"resource": resource})
 
 class ServerError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str, server_id: int = None):
         super().__init__(message, "SERVER_ERROR", {"server_id": server_id})
 
 class PanelError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str, panel_url: str = None):
         super().__init__(message, "PANEL_ERROR", {"panel_url": panel_url})
 
 class VPNConnectionError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str, config_id: int = None):
         super().__init__(message, "VPN_CONNECTION_ERROR", {"config_id": config_id})
 
 class DatabaseConnectionError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str = "Database connection failed"):
         super().__init__(message, "DATABASE_ERROR")
 
 class RateLimitError(VPNException):
+    __slots__ = ()
+    
     def __init__(self, message: str = "Rate limit exceeded"):
         super().__init__(message, "RATE_LIMIT_ERROR")
 
@@ -73,20 +111,22 @@ def create_error_response(
         "message": message,
         "code": code,
         "data": None,
-        "errors": errors or [],
+        "errors": errors or _NO_ERRORS,
         "details": details or {},
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": utc_now_iso()
     }
 
 def create_validation_error_response(errors: List[Dict[str, Any]]) -> Dict[str, Any]:
-    formatted_errors = []
-    for error in errors:
-        formatted_errors.append({
-            "field": ".".join(str(loc) for loc in error.get("loc", [])),
+    join = ".".join
+    formatted_errors = [
+        {
+            "field": join(map(str, error.get("loc", ()))),
             "message": error.get("msg", "Validation error"),
             "type": error.get("type", "validation_error"),
             "input": error.get("input")
-        })
+        }
+        for error in errors
+    ]
     
     return {
         "status": "error",
@@ -94,35 +134,23 @@ def create_validation_error_response(errors: List[Dict[str, Any]]) -> Dict[str,
         "code": "VALIDATION_ERROR",
         "data": None,
         "errors": formatted_errors,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": utc_now_iso()
     }
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logger.warning(f"Validation error on {request.url}: {exc.errors()}")
-    return JSONResponse(
+    errors = exc.errors()
+    logger.warning("Validation error on %s: %s", request.url, errors)
+    return ORJSONResponse(
         status_code=422,
-        content=create_validation_error_response(exc.errors())
+        content=create_validation_error_response(errors)
     )
 
 async def vpn_exception_handler(request: Request, exc: VPNException):
-    logger.error(f"VPN error on {request.url}: {exc.message}")
-    
-    status_code_map = {
-        "AUTH_ERROR": 401,
-        "AUTHORIZATION_ERROR": 403,
-        "VALIDATION_ERROR": 400,
-        "RESOURCE_NOT_FOUND": 404,
-        "RESOURCE_CONFLICT": 409,
-        "SERVER_ERROR": 500,
-        "PANEL_ERROR": 502,
-        "VPN_CONNECTION_ERROR": 503,
-        "DATABASE_ERROR": 500,
-        "RATE_LIMIT_ERROR": 429
-    }
+    logger.error("VPN error on %s: %s", request.url, exc.message)
     
-    status_code = status_code_map.get(exc.code, 500)
+    status_code = STATUS_CODE_MAP.get(exc.code, 500)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content=create_error_response(
             status_code=status_code,
@@ -133,9 +161,9 @@ async def vpn_exception_handler(request: Request, exc: VPNException):
     )
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-    logger.error(f"HTTP error on {request.url}: {exc.detail}")
+    logger.error("HTTP error on %s: %s", request.url, exc.detail)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=create_error_response(
             status_code=exc.status_code,
@@ -145,10 +173,10 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     )
 
 async def database_exception_handler(request: Request, exc: DatabaseError):
-    logger.error(f"Database error on {request.url}: {str(exc)}")
+    logger.error("Database error on %s: %s", request.url, exc)
     
     if isinstance(exc, IntegrityError):
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=409,
             content=create_error_response(
                 status_code=409,
@@ -157,7 +185,7 @@ async def database_exception_handler(request: Request, exc: DatabaseError):
             )
         )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=create_error_response(
             status_code=500,
@@ -167,9 +195,9 @@ async def database_exception_handler(request: Request, exc: DatabaseError):
     )
 
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unexpected error on {request.url}: {str(exc)}", exc_info=True)
+    logger.error("Unexpected error on %s: %s", request.url, exc, exc_info=True)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=create_error_response(
             status_code=500,
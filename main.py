@@ -1,51 +1,99 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
+import anyio
 import asyncio
 import logging
+import orjson
+import os
 import sys
-from datetime import datetime
+import time
+from utils.timestamps import utc_now_iso
+from utils.cache import cache
+from exceptions import general_exception_handler
 from sqlalchemy.orm import Session
-from database import get_db, engine
+from database import engine, ping_database, schema_exists
 from models import Base
 from routes import auth, vpn, admin, servers
 from config import settings, validate_config, get_config_summary
 import uvicorn
 
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL.upper()),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_LEVEL = logging.getLevelName(settings.LOG_LEVEL.upper())
+if not isinstance(LOG_LEVEL, int):
+    LOG_LEVEL = logging.INFO
+
+root_logger = logging.getLogger()
+if not root_logger.handlers:
+    logging.basicConfig(
+        level=LOG_LEVEL,
+        format=LOG_FORMAT,
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
 
 if settings.LOG_FILE:
-    file_handler = logging.FileHandler(settings.LOG_FILE)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    ))
-    logging.getLogger().addHandler(file_handler)
+    log_file_path = os.path.abspath(settings.LOG_FILE)
+    if not any(
+        isinstance(handler, logging.FileHandler) and handler.baseFilename == log_file_path
+        for handler in root_logger.handlers
+    ):
+        file_handler = logging.FileHandler(log_file_path)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root_logger.addHandler(file_handler)
 
 logger = logging.getLogger(__name__)
 
 wg_easy_manager = None
 tunnel_manager = None
+database_healthy = None
+healthy_response_cache = {"key": None, "body": b""}
+
+PYTHON_VERSION = sys.version.split()[0]
+
+async def refresh_wg_easy_health(app: FastAPI):
+    while True:
+        await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+        try:
+            success, message = await wg_easy_manager.test_connection()
+        except Exception as e:
+            success, message = False, str(e)
+        app.state.wg_easy_health = (success, message, time.monotonic())
+
+async def cleanup_stale_tunnels(tunnel_manager):
+    # One panel listing per interval reconciles every user's tunnel
+    while True:
+        await asyncio.sleep(settings.TUNNEL_CLEANUP_DELAY)
+        removed = await tunnel_manager.cleanup_inactive_tunnels()
+        if removed:
+            logger.info("Removed %d stale tunnel references", removed)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global wg_easy_manager, tunnel_manager
     
     logger.info("Starting WireGuard VPN Backend...")
+    health_task = None
+    cleanup_task = None
     
     try:
         validate_config()
         logger.info("Configuration validation passed")
         
-        config_summary = get_config_summary()
-        logger.info(f"Configuration loaded: {config_summary}")
+        # Starlette's default of 40 threads would cap DB concurrency below the pool size
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Configuration loaded: %s", get_config_summary())
         
-        logger.info("Initializing database...")
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database initialized successfully")
+        if settings.SKIP_CREATE_ALL:
+            logger.info("Skipping database initialization (SKIP_CREATE_ALL is set)")
+        elif schema_exists(Base.metadata):
+            logger.info("Database schema already present")
+        else:
+            logger.info("Initializing database...")
+            Base.metadata.create_all(bind=engine)
+            logger.info("Database initialized successfully")
         
         logger.info("Initializing wg-easy connection...")
         from utils.wg_panel_manager import WgEasyManager, DynamicTunnelManager
@@ -55,11 +103,14 @@ async def lifespan(app: FastAPI):
             password=settings.WG_EASY_PASSWORD
         )
         
-        success, message = wg_easy_manager.test_connection()
+        success, message = await wg_easy_manager.test_connection()
+        app.state.wg_easy_health = (success, message, time.monotonic())
         if success:
-            logger.info(f"wg-easy connection successful: {message}")
+            logger.info("wg-easy connection successful: %s", message)
+            if settings.WG_EASY_WARM_CONNECTIONS > 0:
+                await wg_easy_manager.warm_up(settings.WG_EASY_WARM_CONNECTIONS)
         else:
-            logger.error(f"wg-easy connection failed: {message}")
+            logger.error("wg-easy connection failed: %s", message)
             if not settings.DEBUG:
                 raise RuntimeError(f"Cannot connect to wg-easy panel: {message}")
         
@@ -68,19 +119,31 @@ async def lifespan(app: FastAPI):
             tunnel_manager = DynamicTunnelManager(wg_easy_manager)
             logger.info("Dynamic tunnel manager initialized")
         
+        # Routes get these through dependencies. The tunnel routes have never
+        # been gated on ENABLE_DYNAMIC_TUNNELS, so they get a registry either way
         app.state.wg_easy_manager = wg_easy_manager
-        app.state.tunnel_manager = tunnel_manager
+        app.state.tunnel_manager = tunnel_manager or DynamicTunnelManager(wg_easy_manager)
+        
+        health_task = asyncio.create_task(refresh_wg_easy_health(app))
+        if settings.TUNNEL_AUTO_CLEANUP:
+            cleanup_task = asyncio.create_task(cleanup_stale_tunnels(app.state.tunnel_manager))
         
         logger.info("WireGuard VPN Backend started successfully!")
         
         yield
         
     except Exception as e:
-        logger.error(f"Failed to start application: {e}")
+        logger.error("Failed to start application: %s", e)
         raise
     
     finally:
         logger.info("Shutting down WireGuard VPN Backend...")
+        if health_task:
+            health_task.cancel()
+        if cleanup_task:
+            cleanup_task.cancel()
+        if wg_easy_manager:
+            await wg_easy_manager.close()
         logger.info("WireGuard VPN Backend shutdown complete")
 
 app = FastAPI(
@@ -89,9 +152,14 @@ app = FastAPI(
     version="2.0.0",
     docs_url=settings.DOCS_URL,
     redoc_url=settings.REDOC_URL,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# Unexpected errors are logged and turned into a 500 envelope in one place
+# rather than by a try/except wrapped around every handler
+app.add_exception_handler(Exception, general_exception_handler)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS_LIST,
@@ -128,59 +196,88 @@ async def root():
         }
     }
 
-@app.get("/health")
-async def health_check():
+async def check_database():
+    global database_healthy
+    
+    try:
+        await asyncio.wait_for(asyncio.to_thread(ping_database), timeout=1.0)
+        healthy, message = True, "Connected"
+    except asyncio.TimeoutError:
+        healthy, message = False, "Database ping timed out"
+    except Exception as e:
+        healthy, message = False, str(e)
+    
+    if healthy != database_healthy:
+        if healthy:
+            logger.info("Database health check recovered")
+        else:
+            logger.error("Database health check failed: %s", message)
+        database_healthy = healthy
+    
+    return healthy, message
+
+def build_health_status(db_healthy: bool, db_message: str, wg_easy_health, active_tunnels):
     health_status = {
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": utc_now_iso(),
         "services": {},
         "metrics": {}
     }
     
-    try:
-        try:
-            db = next(get_db())
-            db.execute("SELECT 1")
-            health_status["services"]["database"] = {"status": "healthy", "message": "Connected"}
-        except Exception as e:
-            health_status["services"]["database"] = {"status": "unhealthy", "message": str(e)}
+    health_status["services"]["database"] = {
+        "status": "healthy" if db_healthy else "unhealthy",
+        "message": db_message
+    }
+    if not db_healthy:
+        health_status["status"] = "degraded"
+    
+    if wg_easy_manager and wg_easy_health:
+        success, message, _ = wg_easy_health
+        health_status["services"]["wg_easy"] = {
+            "status": "healthy" if success else "unhealthy",
+            "message": message
+        }
+        if not success:
             health_status["status"] = "degraded"
+    else:
+        health_status["services"]["wg_easy"] = {"status": "not_configured", "message": "wg-easy manager not initialized"}
+    
+    if tunnel_manager:
+        health_status["services"]["tunnel_manager"] = {"status": "healthy", "message": "Running"}
+        health_status["metrics"]["active_tunnels"] = active_tunnels
+    else:
+        health_status["services"]["tunnel_manager"] = {"status": "disabled", "message": "Dynamic tunnels disabled"}
+    
+    health_status["metrics"]["python_version"] = PYTHON_VERSION
+    
+    return health_status
+
+@app.get("/health")
+async def health_check():
+    try:
+        db_healthy, db_message = await check_database()
+        wg_easy_health = getattr(app.state, "wg_easy_health", None)
+        active_tunnels = tunnel_manager.get_active_tunnel_count() if tunnel_manager else None
         
-        if wg_easy_manager:
-            try:
-                success, message = wg_easy_manager.test_connection()
-                health_status["services"]["wg_easy"] = {
-                    "status": "healthy" if success else "unhealthy",
-                    "message": message
-                }
-                if not success:
-                    health_status["status"] = "degraded"
-            except Exception as e:
-                health_status["services"]["wg_easy"] = {"status": "unhealthy", "message": str(e)}
-                health_status["status"] = "degraded"
-        else:
-            health_status["services"]["wg_easy"] = {"status": "not_configured", "message": "wg-easy manager not initialized"}
-        
-        if tunnel_manager:
-            try:
-                active_tunnels = tunnel_manager.get_active_tunnel_count()
-                health_status["services"]["tunnel_manager"] = {"status": "healthy", "message": "Running"}
-                health_status["metrics"]["active_tunnels"] = active_tunnels
-            except Exception as e:
-                health_status["services"]["tunnel_manager"] = {"status": "unhealthy", "message": str(e)}
-                health_status["status"] = "degraded"
-        else:
-            health_status["services"]["tunnel_manager"] = {"status": "disabled", "message": "Dynamic tunnels disabled"}
+        # A healthy body is reused for up to a second while nothing changes
+        cache_key = (int(time.time()), db_healthy, wg_easy_health, active_tunnels)
+        if cache_key == healthy_response_cache["key"]:
+            return Response(content=healthy_response_cache["body"], media_type="application/json")
         
-        health_status["metrics"]["python_version"] = sys.version.split()[0]
+        health_status = build_health_status(db_healthy, db_message, wg_easy_health, active_tunnels)
+        if health_status["status"] != "healthy":
+            return health_status
         
-        return health_status
+        body = orjson.dumps(health_status)
+        healthy_response_cache["key"] = cache_key
+        healthy_response_cache["body"] = body
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         return {
             "status": "unhealthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now_iso(),
             "error": str(e)
         }
 
@@ -194,7 +291,7 @@ async def get_metrics():
     
     try:
         metrics = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now_iso(),
             "uptime_seconds": 0,
             "total_requests": 0,
             "active_tunnels": 0,
@@ -204,14 +301,16 @@ async def get_metrics():
         if tunnel_manager:
             metrics["active_tunnels"] = tunnel_manager.get_active_tunnel_count()
         
-        if wg_easy_manager:
-            success, _ = wg_easy_manager.test_connection()
-            metrics["wg_easy_status"] = "connected" if success else "disconnected"
+        wg_easy_health = getattr(app.state, "wg_easy_health", None)
+        if wg_easy_manager and wg_easy_health:
+            metrics["wg_easy_status"] = "connected" if wg_easy_health[0] else "disconnected"
+        
+        metrics["cache"] = cache.get_stats()
         
         return metrics
         
     except Exception as e:
-        logger.error(f"Error getting metrics: {e}")
+        logger.error("Error getting metrics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get metrics"
@@ -222,5 +321,8 @@ if __name__ == "__main__":
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
+        loop="uvloop",
+        http="httptools",
+        workers=settings.WORKERS,
         log_level=settings.LOG_LEVEL.lower()
     )
\ No newline at end of file
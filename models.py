@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, BigInteger, Index, UniqueConstraint, DDL, event, text, cast, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+# The trigram indexes on servers need the extension before create_all builds them
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 class User(Base):
     __tablename__ = "users"
     
@@ -21,6 +24,13 @@ class User(Base):
 
 class Server(Base):
     __tablename__ = "servers"
+    __table_args__ = (
+        UniqueConstraint("endpoint", "port", name="uq_server_endpoint_port"),
+        # Let substring ILIKE searches use an index instead of a seq scan
+        Index("ix_server_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_server_location_trgm", "location", postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"}),
+        Index("ix_server_endpoint_trgm", "endpoint", postgresql_using="gin", postgresql_ops={"endpoint": "gin_trgm_ops"}),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -40,10 +50,21 @@ class Server(Base):
 
 class VPNConfig(Base):
     __tablename__ = "vpn_configs"
+    __table_args__ = (
+        # Partial: only live configs are ever probed by user, and history would bloat it.
+        # Trailing id serves the newest-first /configs listing without a sort.
+        Index("ix_vpnconfig_user_active", "user_id", "id", postgresql_where=text("is_active")),
+        Index("ix_vpnconfig_server_active", "server_id", "is_active"),
+        # A user never holds two live records on one server; tunnel saves retire the old one first.
+        # Existing databases get it (and the other indexes here) from alembic revision b7d2f0c41e9a.
+        Index("ux_vpnconfig_active_user_server", "user_id", "server_id", unique=True, postgresql_where=text("is_active")),
+        # Peer sync and force-disconnect resolve live configs from `wg show` public keys
+        Index("ix_vpnconfig_public_key_active", "public_key", postgresql_where=text("is_active")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    server_id = Column(Integer, ForeignKey("servers.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    server_id = Column(Integer, ForeignKey("servers.id"), nullable=False, index=True)
     public_key = Column(String, nullable=False)
     private_key = Column(String, nullable=False)
     allocated_ip = Column(String, nullable=False)
@@ -57,25 +78,54 @@ class VPNConfig(Base):
 
 class UsageLog(Base):
     __tablename__ = "usage_logs"
+    __table_args__ = (
+        Index("ix_usagelog_user_session", "user_id", "session_start"),
+        Index("ix_usagelog_session_id", "session_start", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    vpn_config_id = Column(Integer, ForeignKey("vpn_configs.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    vpn_config_id = Column(Integer, ForeignKey("vpn_configs.id"), nullable=False, index=True)
     bytes_sent = Column(BigInteger, default=0)
     bytes_received = Column(BigInteger, default=0)
     last_handshake = Column(DateTime, nullable=True)
     session_start = Column(DateTime, default=datetime.utcnow)
     session_end = Column(DateTime, nullable=True)
+    # Whole minutes, computed by Postgres; NULL while the session is open.
+    # Deferred so only queries that undefer it pay for the expression.
+    duration_minutes = column_property(
+        cast(func.floor(func.extract("epoch", session_end - session_start) / 60), Integer),
+        deferred=True
+    )
     
     user = relationship("User", back_populates="usage_logs")
     vpn_config = relationship("VPNConfig", back_populates="usage_logs")
 
 class IPAllocation(Base):
     __tablename__ = "ip_allocations"
+    __table_args__ = (
+        Index("ix_ipalloc_server_free", "server_id", "is_allocated"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    server_id = Column(Integer, ForeignKey("servers.id"), nullable=False)
+    server_id = Column(Integer, ForeignKey("servers.id"), nullable=False, index=True)
     ip_address = Column(String, nullable=False)
     is_allocated = Column(Boolean, default=False)
-    allocated_to = Column(Integer, ForeignKey("vpn_configs.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    allocated_to = Column(Integer, ForeignKey("vpn_configs.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    @classmethod
+    def allocate(cls, db, server_id: int, config_id: int = None):
+        """Claim the lowest free address of a server in one statement, skipping rows locked by concurrent allocations"""
+        return db.execute(text("""
+            UPDATE ip_allocations
+            SET is_allocated = true, allocated_to = :config_id
+            WHERE id = (
+                SELECT id FROM ip_allocations
+                WHERE server_id = :server_id AND is_allocated = false
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, ip_address
+        """), {"server_id": server_id, "config_id": config_id}).first()
\ No newline at end of file
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, tuple_, update
+from sqlalchemy.orm import Session, load_only, selectinload, undefer
+from pydantic import TypeAdapter
+from typing import Dict, List, Optional, Tuple
 from database import get_db
 from schemas import AdminUserResponse, VPNConfigResponse, UsageLogResponse, ConnectionStatsResponse
 from models import User, VPNConfig, UsageLog, IPAllocation
@@ -8,67 +10,178 @@ from dependencies import get_admin_user
 from utils.wireguard import get_peer_stats
 from utils.server_manager import server_manager
 from utils.connection_monitor import connection_monitor
+from utils.http_cache import membership_fingerprint, make_etag, is_not_modified, not_modified_response
+from utils.cache import cache, user_info_key, user_key, CONNECTION_STATS_KEY
+from config import settings
 from datetime import datetime
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+REVOKE_CONCURRENCY = 10
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+USER_LIST_ADAPTER = TypeAdapter(List[AdminUserResponse])
+CONFIG_LIST_ADAPTER = TypeAdapter(List[VPNConfigResponse])
+USAGE_LIST_ADAPTER = TypeAdapter(List[UsageLogResponse])
+
+def list_response(adapter: TypeAdapter, rows: list, headers: Dict[str, str]) -> Response:
+    # One pydantic-core pass validates and encodes the page, instead of
+    # FastAPI validating row by row and then running jsonable_encoder
+    payload = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+def windowed_page(query, offset: int, limit: int) -> Tuple[list, Optional[int]]:
+    """One page plus the row count of the whole filtered query, in a single statement"""
+    rows = query.add_columns(func.count().over().label("total")).offset(offset).limit(limit).all()
+    if not rows:
+        # Past the last page there is no row to carry the count
+        return [], None
+    return [row[0] for row in rows], rows[0].total
+
+def parse_usage_cursor(cursor: str) -> Tuple[datetime, int]:
+    session_start, _, log_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(session_start), int(log_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
 @router.get("/users", response_model=List[AdminUserResponse])
-def get_all_users(db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    users = db.query(User).all()
-    return users
+def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    include_total: bool = False,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    headers = {}
+    # AdminUserResponse nests each user's configs and their servers;
+    # selectinload fetches those in two extra queries for the whole page
+    query = db.query(User).options(
+        load_only(User.id, User.username, User.email, User.is_active, User.is_admin, User.created_at),
+        selectinload(User.vpn_configs).selectinload(VPNConfig.server)
+    ).order_by(User.id)
+    if include_total:
+        users, total = windowed_page(query, offset, limit)
+        if total is None:
+            total = db.query(func.count(User.id)).scalar()
+        headers["X-Total-Count"] = str(total)
+    else:
+        users = query.offset(offset).limit(limit).all()
+    return list_response(USER_LIST_ADAPTER, users, headers)
 
 @router.get("/configs", response_model=List[VPNConfigResponse])
-def get_all_configs(db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    configs = db.query(VPNConfig).filter(VPNConfig.is_active == True).all()
-    return configs
+def get_all_configs(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    active = VPNConfig.is_active == True
+    total, max_id, id_sum = membership_fingerprint(db, VPNConfig.id, active)
+    etag = make_etag("configs", total, max_id, id_sum, limit, offset)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    configs = db.query(VPNConfig).options(
+        selectinload(VPNConfig.server)
+    ).filter(active).order_by(VPNConfig.id).offset(offset).limit(limit).all()
+    return list_response(CONFIG_LIST_ADAPTER, configs, {"ETag": etag, "X-Total-Count": str(total)})
 
 @router.delete("/user/{user_id}/revoke")
 def revoke_user_access(user_id: int, db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    vpn_configs = db.query(VPNConfig).filter(
+    vpn_configs = db.query(VPNConfig).options(selectinload(VPNConfig.server)).filter(
         VPNConfig.user_id == user_id,
         VPNConfig.is_active == True
     ).all()
     
+    # Peer removal is network I/O against each WireGuard server; run it in
+    # parallel (bounded so one server isn't flooded), then apply the DB
+    # changes on this thread since the session is not thread-safe
+    results = []
+    if vpn_configs:
+        with ThreadPoolExecutor(max_workers=min(REVOKE_CONCURRENCY, len(vpn_configs))) as executor:
+            results = list(executor.map(
+                lambda config: server_manager.remove_peer(config.server, config.public_key),
+                vpn_configs
+            ))
+    
     revoked_count = 0
-    for config in vpn_configs:
-        success, message = server_manager.destroy_tunnel_with_validation(db, config)
+    for config, success in zip(vpn_configs, results):
         if success:
+            server_manager.release_config(db, config)
             revoked_count += 1
         else:
-            logger.warning(f"Failed to revoke config {config.id}: {message}")
+            logger.warning(f"Failed to revoke config {config.id}: could not remove peer from WireGuard server")
     
     user.is_active = False
     db.commit()
+    cache.delete(user_info_key(user_id), user_key(user.username))
     
     return {"message": f"Revoked access for user {user.username}. {revoked_count} tunnels removed."}
 
 @router.post("/user/{user_id}/activate")
 def activate_user(user_id: int, db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.execute(
+        update(User).where(User.id == user_id).values(is_active=True).returning(User.username)
+    ).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    user.is_active = True
     db.commit()
+    cache.delete(user_info_key(user_id), user_key(user.username))
     
     return {"message": f"Activated user {user.username}"}
 
 @router.get("/usage", response_model=List[UsageLogResponse])
-def get_usage_stats(db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    usage_logs = db.query(UsageLog).order_by(UsageLog.session_start.desc()).limit(100).all()
-    return usage_logs
+def get_usage_stats(
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, max_length=64, description="X-Next-Cursor from the previous page"),
+    include_total: bool = False,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    headers = {}
+    # id breaks ties between sessions that started together, so the order is stable to seek on
+    query = db.query(UsageLog).options(undefer(UsageLog.duration_minutes)).order_by(
+        UsageLog.session_start.desc(), UsageLog.id.desc()
+    )
+    
+    if cursor is not None:
+        # Keyset pagination: seek past the last row seen instead of OFFSET,
+        # so a page costs the same however deep it is
+        query = query.filter(tuple_(UsageLog.session_start, UsageLog.id) < parse_usage_cursor(cursor))
+        usage_logs = query.limit(limit).all()
+    elif include_total:
+        usage_logs, total = windowed_page(query, offset, limit)
+        if total is None:
+            total = db.query(func.count(UsageLog.id)).scalar()
+        headers["X-Total-Count"] = str(total)
+    else:
+        usage_logs = query.offset(offset).limit(limit).all()
+    
+    last = usage_logs[-1] if len(usage_logs) == limit else None
+    if last is not None and last.session_start is not None:
+        headers["X-Next-Cursor"] = f"{last.session_start.isoformat()}_{last.id}"
+    return list_response(USAGE_LIST_ADAPTER, usage_logs, headers)
 
 @router.post("/sync-peer-stats")
 def sync_peer_stats(db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
@@ -84,12 +197,17 @@ def sync_peer_stats(db: Session = Depends(get_db), admin_user: User = Depends(ge
 
 @router.get("/connection-stats", response_model=ConnectionStatsResponse)
 def get_connection_stats(admin_user: User = Depends(get_admin_user)):
+    stats = cache.get_json(CONNECTION_STATS_KEY)
+    if stats is not None:
+        return stats
+    
     stats = connection_monitor.get_connection_stats()
     if not stats:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve connection statistics"
         )
+    cache.set_json(CONNECTION_STATS_KEY, stats, settings.CONNECTION_STATS_CACHE_TTL)
     return stats
 
 @router.post("/cleanup-disconnected")
@@ -106,8 +224,8 @@ def cleanup_disconnected_peers(db: Session = Depends(get_db), admin_user: User =
 
 @router.delete("/config/{config_id}/force-delete")
 def force_delete_config(config_id: int, db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    vpn_config = db.query(VPNConfig).filter(VPNConfig.id == config_id).first()
-    if not vpn_config:
+    vpn_config = db.get(VPNConfig, config_id)
+    if vpn_config is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="VPN configuration not found"
@@ -124,13 +242,20 @@ def force_delete_config(config_id: int, db: Session = Depends(get_db), admin_use
         )
 
 @router.get("/server-health")
-def get_all_server_health(db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
+async def get_all_server_health(db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
     from models import Server
-    servers = db.query(Server).filter(Server.is_active == True).all()
+    servers = await asyncio.to_thread(
+        lambda: db.query(Server).filter(Server.is_active == True).all()
+    )
+    
+    # Each check is a blocking TCP/ping probe; run them side by side so the
+    # endpoint takes as long as the slowest server rather than the sum
+    results = await asyncio.gather(
+        *(asyncio.to_thread(server_manager.is_server_healthy, server) for server in servers)
+    )
     
     health_reports = []
-    for server in servers:
-        is_healthy, health = server_manager.is_server_healthy(server)
+    for server, (is_healthy, health) in zip(servers, results):
         health_reports.append({
             "server_id": server.id,
             "server_name": server.name,
@@ -1,31 +1,27 @@
 from fastapi import APIRouter, Depends, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from database import get_db
 from schemas import UserCreate, UserLogin, AuthResponse, UserResponse, SuccessResponse
 from models import User
 from auth.password import hash_password, verify_password
-from auth.jwt_handler import create_access_token
+from auth.jwt_handler import create_access_token, token_seconds_remaining, forget_verified_token
 from exceptions import AuthenticationError, ValidationError, ResourceConflictError
 from datetime import timedelta, datetime
 from config import settings
 import logging
-from dependencies import get_current_user
+from dependencies import get_current_user, security
+from utils.cache import cache, user_info_key, revoked_token_key
 from models import VPNConfig, UsageLog
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     try:
-        existing_user = db.query(User).filter(User.username == user_data.username.lower()).first()
-        if existing_user:
-            raise ResourceConflictError("Username already exists", "user")
-        
-        existing_email = db.query(User).filter(User.email == user_data.email.lower()).first()
-        if existing_email:
-            raise ResourceConflictError("Email already registered", "email")
-        
         hashed_password = hash_password(user_data.password)
         new_user = User(
             username=user_data.username.lower(),
@@ -35,8 +31,17 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             is_admin=False
         )
         
+        # The unique indexes on username/email decide duplicates; this is one
+        # round-trip and stays correct when two sign-ups race
         db.add(new_user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None) or ""
+            if "email" in constraint:
+                raise ResourceConflictError("Email already registered", "email")
+            raise ResourceConflictError("Username already exists", "user")
         db.refresh(new_user)
         
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -45,14 +50,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             expires_delta=access_token_expires
         )
         
-        user_response = UserResponse(
-            id=new_user.id,
-            username=new_user.username,
-            email=new_user.email,
-            is_active=new_user.is_active,
-            is_admin=new_user.is_admin,
-            created_at=new_user.created_at
-        )
+        user_response = UserResponse.model_validate(new_user)
         
         logger.info(f"New user registered: {new_user.username}")
         
@@ -60,7 +58,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             status="success",
             message="User registered successfully",
             data={
-                "user": user_response.dict(),
+                "user": user_response,
                 "access_token": access_token,
                 "token_type": "bearer",
                 "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
@@ -75,9 +73,11 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         raise Exception("Registration failed. Please try again.")
 
 @router.post("/login", response_model=AuthResponse)
-async def login_user(credentials: UserLogin, db: Session = Depends(get_db)):
+def login_user(credentials: UserLogin, db: Session = Depends(get_db)):
     try:
-        user = db.query(User).filter(User.username == credentials.username.lower()).first()
+        user = db.execute(
+            select(User).where(User.username == credentials.username.lower())
+        ).scalar_one_or_none()
         
         if not user:
             raise AuthenticationError("Invalid username or password")
@@ -94,14 +94,7 @@ async def login_user(credentials: UserLogin, db: Session = Depends(get_db)):
             expires_delta=access_token_expires
         )
         
-        user_response = UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            is_active=user.is_active,
-            is_admin=user.is_admin,
-            created_at=user.created_at
-        )
+        user_response = UserResponse.model_validate(user)
         
         logger.info(f"User logged in: {user.username}")
         
@@ -109,7 +102,7 @@ async def login_user(credentials: UserLogin, db: Session = Depends(get_db)):
             status="success",
             message="Login successful",
             data={
-                "user": user_response.dict(),
+                "user": user_response,
                 "access_token": access_token,
                 "token_type": "bearer",
                 "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
@@ -123,14 +116,24 @@ async def login_user(credentials: UserLogin, db: Session = Depends(get_db)):
         raise Exception("Login failed. Please try again.")
 
 @router.post("/logout", response_model=SuccessResponse)
-async def logout_user(current_user: User = Depends(get_current_user)):
+def logout_user(
+    current_user: User = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
     try:
+        # Deny the token until it would have expired anyway
+        token = credentials.credentials
+        remaining = token_seconds_remaining(token)
+        if remaining > 0:
+            cache.set_json(revoked_token_key(token), True, remaining)
+        forget_verified_token(token)
+        
         logger.info(f"User logged out: {current_user.username}")
         
         return SuccessResponse(
             status="success",
             message="Logout successful",
-            data={"logged_out_at": datetime.utcnow().isoformat()}
+            data={"logged_out_at": datetime.utcnow()}
         )
         
     except Exception as e:
@@ -138,28 +141,38 @@ async def logout_user(current_user: User = Depends(get_current_user)):
         raise Exception("Logout failed. Please try again.")
 
 @router.get("/me", response_model=AuthResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     try:
-        from sqlalchemy import func
-        
-        vpn_configs_count = db.query(VPNConfig).filter(
+        cache_key = user_info_key(current_user.id)
+        user_data = cache.get_json(cache_key)
+        if user_data is not None:
+            return AuthResponse(
+                status="success",
+                message="User information retrieved successfully",
+                data={
+                    "user": user_data,
+                    "access_token": None,
+                    "token_type": "bearer",
+                    "expires_in": None
+                }
+            )
+        
+        active_configs = select(func.count(VPNConfig.id)).where(
             VPNConfig.user_id == current_user.id,
             VPNConfig.is_active == True
-        ).count()
-        
-        total_usage_logs = db.query(UsageLog).filter(UsageLog.user_id == current_user.id).count()
-        
-        latest_usage = db.query(UsageLog).filter(
-            UsageLog.user_id == current_user.id
-        ).order_by(UsageLog.session_start.desc()).first()
-        
-        total_bytes_sent = db.query(func.sum(UsageLog.bytes_sent)).filter(
-            UsageLog.user_id == current_user.id
-        ).scalar() or 0
-        
-        total_bytes_received = db.query(func.sum(UsageLog.bytes_received)).filter(
-            UsageLog.user_id == current_user.id
-        ).scalar() or 0
+        ).scalar_subquery()
+        
+        # One round-trip: usage_logs is scanned once for every aggregate
+        vpn_configs_count, total_usage_logs, total_bytes_sent, total_bytes_received, last_connection = db.execute(
+            select(
+                active_configs,
+                func.count(UsageLog.id),
+                # SUM(bigint) is numeric in Postgres; cast back so it isn't a Decimal
+                cast(func.coalesce(func.sum(UsageLog.bytes_sent), 0), BigInteger),
+                cast(func.coalesce(func.sum(UsageLog.bytes_received), 0), BigInteger),
+                func.max(UsageLog.session_start)
+            ).where(UsageLog.user_id == current_user.id)
+        ).one()
         
         user_data = {
             "id": current_user.id,
@@ -174,9 +187,10 @@ async def get_current_user_info(current_user: User = Depends(get_current_user),
                 "total_bytes_sent": total_bytes_sent,
                 "total_bytes_received": total_bytes_received,
                 "total_data_used": total_bytes_sent + total_bytes_received,
-                "last_connection": latest_usage.session_start.isoformat() if latest_usage else None
+                "last_connection": last_connection.isoformat() if last_connection else None
             }
         }
+        cache.set_json(cache_key, user_data, settings.USER_INFO_CACHE_TTL)
         
         return AuthResponse(
             status="success",
@@ -202,14 +216,7 @@ async def refresh_token(current_user: User = Depends(get_current_user)):
             expires_delta=access_token_expires
         )
         
-        user_response = UserResponse(
-            id=current_user.id,
-            username=current_user.username,
-            email=current_user.email,
-            is_active=current_user.is_active,
-            is_admin=current_user.is_admin,
-            created_at=current_user.created_at
-        )
+        user_response = UserResponse.model_validate(current_user)
         
         logger.info(f"Token refreshed for user: {current_user.username}")
         
@@ -217,7 +224,7 @@ async def refresh_token(current_user: User = Depends(get_current_user)):
             status="success",
             message="Token refreshed successfully",
             data={
-                "user": user_response.dict(),
+                "user": user_response,
                 "access_token": access_token,
                 "token_type": "bearer",
                 "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import exists, insert, or_, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from pydantic import TypeAdapter
+from typing import Iterator, List, Optional
+from database import get_db, SessionLocal
 from schemas import ServerCreate, ServerResponse, ServerCreateFromPanel
 from models import Server, User, IPAllocation, VPNConfig
 from dependencies import get_current_user, get_admin_user
 from utils.wireguard import generate_keypair, generate_preshared_key
 from utils.server_manager import server_manager
 from utils.panel_manager import panel_manager
+from utils.http_cache import membership_fingerprint, make_etag, is_not_modified, not_modified_response
+from utils.cache import cache, server_list_key
 import ipaddress
+from itertools import islice
 from config import settings
 import logging
 from urllib.parse import urlparse
@@ -16,14 +22,83 @@ from urllib.parse import urlparse
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+MAX_PAGE_SIZE = 500
+IP_POOL_BATCH_SIZE = 1000
+SERVER_LIST_ADAPTER = TypeAdapter(List[ServerResponse])
+
 @router.get("/", response_model=List[ServerResponse])
-def get_servers(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    servers = db.query(Server).filter(Server.is_active == True).all()
-    return servers
+def get_servers(
+    request: Request,
+    cursor: Optional[int] = Query(None, ge=0, description="Return servers with an id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    search: Optional[str] = Query(None, max_length=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    criteria = [Server.is_active == True]
+    if search:
+        # Backed by the pg_trgm GIN indexes on these columns
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        criteria.append(or_(
+            Server.name.ilike(pattern, escape="\\"),
+            Server.location.ilike(pattern, escape="\\"),
+            Server.endpoint.ilike(pattern, escape="\\")
+        ))
+    
+    total, max_id, id_sum = membership_fingerprint(db, Server.id, *criteria)
+    etag = make_etag("servers", total, max_id, id_sum, cursor, limit, search)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    # Clients may keep the body but must revalidate; a matching ETag costs one aggregate query
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if include_total:
+        # Already counted for the ETag; no extra query
+        headers["X-Total-Count"] = str(total)
+    
+    cached_page = cache.get_json(server_list_key(etag))
+    if cached_page is not None:
+        headers.update(cached_page["headers"])
+        return Response(content=cached_page["payload"], media_type="application/json", headers=headers)
+    
+    # Keyset pagination: seek past the last id seen instead of OFFSET, so a
+    # page costs the same however deep it is. Without a limit the whole
+    # list is returned as before.
+    query = db.query(Server).filter(*criteria)
+    if cursor is not None:
+        query = query.filter(Server.id > cursor)
+    query = query.order_by(Server.id)
+    
+    page_headers = {}
+    if limit is None:
+        servers = query.all()
+    else:
+        servers = query.limit(limit + 1).all()
+        has_more = len(servers) > limit
+        servers = servers[:limit]
+        page_headers["X-Has-More"] = "true" if has_more else "false"
+        if has_more:
+            page_headers["X-Next-Cursor"] = str(servers[-1].id)
+    
+    # Validate and encode the whole page in one pydantic-core pass rather
+    # than letting FastAPI validate row by row and then JSON-encode again
+    payload = SERVER_LIST_ADAPTER.dump_json(
+        SERVER_LIST_ADAPTER.validate_python(servers, from_attributes=True)
+    ).decode()
+    cache.set_json(
+        server_list_key(etag),
+        {"payload": payload, "headers": page_headers},
+        settings.SERVER_LIST_CACHE_TTL
+    )
+    
+    headers.update(page_headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 @router.post("/create-from-panel", response_model=ServerResponse)
 def create_server_from_panel(
     server_data: ServerCreateFromPanel, 
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db), 
     admin_user: User = Depends(get_admin_user)
 ):
@@ -44,17 +119,9 @@ def create_server_from_panel(
                 detail="Invalid panel URL"
             )
         
-        # Check if server already exists
-        existing_server = db.query(Server).filter(
-            Server.endpoint == endpoint,
-            Server.port == 51820
-        ).first()
-        
-        if existing_server:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Server with endpoint {endpoint}:51820 already exists"
-            )
+        # The admin lookup checked out a connection; hand it back before the
+        # panel round-trips so slow panels don't pin a pool slot
+        db.close()
         
         # Test panel connection and authenticate
         logger.info(f"Connecting to WireGuard panel: {panel_url}")
@@ -106,15 +173,22 @@ def create_server_from_panel(
         )
         
         db.add(db_server)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Server with endpoint {server_info['endpoint']}:{server_info['port']} already exists"
+            )
         db.refresh(db_server)
         
-        # Populate IP pool
-        populate_ip_pool(db, db_server.id, server_info['subnet'])
+        # Populate IP pool after the response is sent
+        background_tasks.add_task(populate_ip_pool_in_background, db_server.id, server_info['subnet'])
         
         logger.info(f"Server '{server_data.name}' created successfully with ID: {db_server.id}")
         
-        return db_server
+        return pending_server_response(db_server)
         
     except HTTPException:
         raise
@@ -126,18 +200,12 @@ def create_server_from_panel(
         )
 
 @router.post("/", response_model=ServerResponse)
-def create_server(server: ServerCreate, db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    existing_server = db.query(Server).filter(
-        Server.endpoint == server.endpoint,
-        Server.port == server.port
-    ).first()
-    
-    if existing_server:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Server with this endpoint and port already exists"
-        )
-    
+def create_server(
+    server: ServerCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
     private_key, public_key = generate_keypair()
     preshared_key = generate_preshared_key()
     
@@ -154,36 +222,56 @@ def create_server(server: ServerCreate, db: Session = Depends(get_db), admin_use
         panel_password=None
     )
     db.add(db_server)
-    db.commit()
+    # uq_server_endpoint_port rejects duplicates, race-free and in the same round-trip
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Server with this endpoint and port already exists"
+        )
     db.refresh(db_server)
     
-    populate_ip_pool(db, db_server.id, settings.VPN_SUBNET)
-    
-    health = server_manager.comprehensive_server_check(db_server)
-    if not health.is_responsive:
-        logger.warning(f"New server {db_server.name} is not responding: {health.error_message}")
+    background_tasks.add_task(populate_ip_pool_in_background, db_server.id, settings.VPN_SUBNET)
+    background_tasks.add_task(check_new_server, db_server)
     
-    return db_server
+    return pending_server_response(db_server)
 
 @router.get("/{server_id}", response_model=ServerResponse)
-def get_server(server_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    server = db.query(Server).filter(Server.id == server_id, Server.is_active == True).first()
-    if not server:
+def get_server(
+    server_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    server = db.get(Server, server_id)
+    if server is None or not server.is_active:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Server not found"
         )
+    
+    etag = make_etag("server", server.id, server.created_at)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    response.headers["ETag"] = etag
     return server
 
 @router.get("/{server_id}/health")
 def get_server_health(server_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    server = db.query(Server).filter(Server.id == server_id, Server.is_active == True).first()
-    if not server:
+    server = db.get(Server, server_id)
+    if server is None or not server.is_active:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Server not found"
         )
     
+    # A stale health entry means a live probe; don't hold the connection through it
+    db.close()
+    
     is_healthy, health = server_manager.is_server_healthy(server)
     
     return {
@@ -199,12 +287,14 @@ def get_server_health(server_id: int, db: Session = Depends(get_db), current_use
 
 @router.post("/{server_id}/test-connection")
 def test_server_connection(server_id: int, db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    server = db.query(Server).filter(Server.id == server_id).first()
-    if not server:
+    server = db.get(Server, server_id)
+    if server is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Server not found"
         )
+    # Everything below is network probing on already-loaded columns
+    db.close()
     
     health = server_manager.comprehensive_server_check(server)
     
@@ -236,37 +326,98 @@ def test_server_connection(server_id: int, db: Session = Depends(get_db), admin_
 
 @router.delete("/{server_id}")
 def delete_server(server_id: int, db: Session = Depends(get_db), admin_user: User = Depends(get_admin_user)):
-    server = db.query(Server).filter(Server.id == server_id).first()
-    if not server:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Server not found"
-        )
-    
-    active_configs = db.query(VPNConfig).filter(
+    has_active_configs = exists().where(
         VPNConfig.server_id == server_id,
         VPNConfig.is_active == True
-    ).count()
+    )
+    
+    # Existence check, active-config guard and deactivation in one statement
+    server = db.execute(
+        update(Server)
+        .where(Server.id == server_id, ~has_active_configs)
+        .values(is_active=False)
+        .returning(Server.name)
+    ).first()
     
-    if active_configs > 0:
+    if not server:
+        # Nothing was updated; work out why only on this (rare) path
+        db.rollback()
+        if not db.query(exists().where(Server.id == server_id)).scalar():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Server not found"
+            )
+        
+        active_configs = db.query(VPNConfig).filter(
+            VPNConfig.server_id == server_id,
+            VPNConfig.is_active == True
+        ).count()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cannot delete server with {active_configs} active VPN configurations"
         )
     
-    server.is_active = False
     db.commit()
     
     return {"message": f"Server {server.name} has been deactivated"}
 
+def populate_ip_pool_in_background(server_id: int, subnet: str):
+    # The request's session is closed by the time background tasks run
+    db = SessionLocal()
+    try:
+        populate_ip_pool(db, server_id, subnet)
+        logger.info(f"IP pool populated for server {server_id} ({subnet})")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to populate IP pool for server {server_id}: {e}")
+        # A server without addresses can't take tunnels; take it out of rotation
+        try:
+            db.execute(update(Server).where(Server.id == server_id).values(is_active=False))
+            db.commit()
+        except Exception as deactivate_error:
+            db.rollback()
+            logger.error(f"Failed to deactivate server {server_id}: {deactivate_error}")
+    finally:
+        db.close()
+
+def pending_server_response(server: Server) -> ServerResponse:
+    return ServerResponse.model_validate(server).model_copy(update={"provisioning_status": "pending"})
+
+def check_new_server(server: Server):
+    health = server_manager.comprehensive_server_check(server)
+    if not health.is_responsive:
+        logger.warning(f"New server {server.name} is not responding: {health.error_message}")
+
+def pool_addresses(network) -> Iterator[str]:
+    """Host addresses of the subnet, minus the first one (the server's own tunnel IP)"""
+    gateway = network.network_address + 1
+    return (str(ip) for ip in network.hosts() if ip != gateway)
+
+# network + 2 .. broadcast - 1, i.e. every host address except the gateway
+IPV4_POOL_INSERT = text("""
+    INSERT INTO ip_allocations (server_id, ip_address, is_allocated, created_at)
+    SELECT :server_id, host(network(CAST(:subnet AS cidr)) + g), false, now() AT TIME ZONE 'utc'
+    FROM generate_series(2, (broadcast(CAST(:subnet AS cidr)) - network(CAST(:subnet AS cidr))) - 1) AS g
+""")
+
 def populate_ip_pool(db: Session, server_id: int, subnet: str):
     network = ipaddress.ip_network(subnet, strict=False)
-    for ip in network.hosts():
-        if str(ip) != str(network.network_address + 1):
-            ip_allocation = IPAllocation(
-                server_id=server_id,
-                ip_address=str(ip),
-                is_allocated=False
-            )
-            db.add(ip_allocation)
+    
+    if network.version == 4 and network.prefixlen < 31:
+        # Let Postgres expand the range: one statement, no rows on the wire
+        db.execute(IPV4_POOL_INSERT, {"server_id": server_id, "subnet": str(network)})
+        db.commit()
+        return
+    
+    addresses = pool_addresses(network)
+    
+    # Bounded batches keep memory and statement size flat for large subnets
+    while True:
+        rows = [
+            {"server_id": server_id, "ip_address": ip_address, "is_allocated": False}
+            for ip_address in islice(addresses, IP_POOL_BATCH_SIZE)
+        ]
+        if not rows:
+            break
+        db.execute(insert(IPAllocation), rows)
     db.commit()
\ No newline at end of file
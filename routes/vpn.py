@@ -1,79 +1,159 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from database import get_db
-from schemas import VPNConfigResponse, VPNConfigFile, VPNTunnelRequest, DynamicTunnelResponse
-from models import User, VPNConfig
-from dependencies import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session, joinedload, load_only
+from pydantic import TypeAdapter
+from typing import Dict, List, Optional, Tuple
+from database import get_db, SessionLocal
+from schemas import VPNConfigResponse, VPNConfigFile, VPNTunnelRequest, DynamicTunnelResponse, ConfigStatusRequest, TunnelListItem, TunnelBulkDestroyRequest
+from models import Server, User, VPNConfig
+from dependencies import get_current_user, get_current_tunnel, get_wg_easy_manager, get_tunnel_manager
 from utils.wg_panel_manager import DynamicTunnelManager, WgEasyManager
-from utils.qr_generator import generate_qr_code
+from utils.qr_generator import cached_qr_code, cached_qr_png
+from utils.connection_monitor import connection_monitor
+from utils.cache import cache, user_info_key
+from utils.ttl_cache import AsyncTTLValue
+from utils.http_cache import make_etag, is_not_modified, not_modified_response
 from config import settings
 import logging
 import asyncio
+import orjson
 from datetime import datetime
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize the wg-easy manager with your panel details
-wg_easy_manager = WgEasyManager(
-    panel_url=getattr(settings, 'WG_EASY_PANEL_URL', 'http://74.208.112.39:51821'),
-    password=getattr(settings, 'WG_EASY_PASSWORD', '123456789')
-)
+# Comment line sent on idle status streams so proxies don't drop them
+STATUS_STREAM_KEEPALIVE = 15
+MAX_CONFIGS_PAGE_SIZE = 100
+TUNNEL_LIST_ADAPTER = TypeAdapter(List[TunnelListItem])
 
-# Initialize dynamic tunnel manager
-tunnel_manager = DynamicTunnelManager(wg_easy_manager)
+# Dashboards poll these; concurrent pollers share one panel round-trip per TTL
+vpn_status_cache = AsyncTTLValue(settings.VPN_STATUS_CACHE_TTL)
+tunnel_list_cache = AsyncTTLValue(settings.TUNNEL_LIST_CACHE_TTL)
+
+async def load_vpn_status(wg_easy_manager: WgEasyManager, tunnel_manager: DynamicTunnelManager) -> dict:
+    # Independent panel calls; wait for the slower one, not both in turn
+    (success, message), (server_success, server_info, server_msg) = await asyncio.gather(
+        wg_easy_manager.test_connection(),
+        wg_easy_manager.get_server_info()
+    )
+    
+    if success:
+        active_tunnels = tunnel_manager.get_active_tunnel_count()
+        
+        return {
+            "status": "online",
+            "panel_connection": "connected",
+            "message": message,
+            "active_tunnels": active_tunnels,
+            "server_info": server_info if server_success else {},
+            "last_check": datetime.utcnow()
+        }
+    else:
+        return {
+            "status": "offline",
+            "panel_connection": "disconnected", 
+            "message": message,
+            "active_tunnels": 0,
+            "last_check": datetime.utcnow()
+        }
 
 @router.get("/status")
-async def get_vpn_status():
+async def get_vpn_status(
+    wg_easy_manager: WgEasyManager = Depends(get_wg_easy_manager),
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager)
+):
     """Get VPN service status"""
-    try:
-        # Test connection to wg-easy panel
-        success, message = wg_easy_manager.test_connection()
-        
-        if success:
-            # Get server info
-            server_success, server_info, server_msg = wg_easy_manager.get_server_info()
-            active_tunnels = tunnel_manager.get_active_tunnel_count()
-            
-            return {
-                "status": "online",
-                "panel_connection": "connected",
-                "message": message,
-                "active_tunnels": active_tunnels,
-                "server_info": server_info if server_success else {},
-                "last_check": datetime.utcnow().isoformat()
-            }
-        else:
-            return {
-                "status": "offline",
-                "panel_connection": "disconnected", 
-                "message": message,
-                "active_tunnels": 0,
-                "last_check": datetime.utcnow().isoformat()
-            }
-    except Exception as e:
-        logger.error(f"Error getting VPN status: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get VPN status"
+    return await vpn_status_cache.get(lambda: load_vpn_status(wg_easy_manager, tunnel_manager))
+
+# Blocking DB work for the async tunnel endpoints; run via run_in_threadpool
+# so the event loop keeps serving other requests meanwhile. Each opens its
+# own short session so no connection is held across the panel round-trips.
+def save_tunnel_record(user_id: int, tunnel_data: dict) -> int:
+    # One active record per user and server: a record left behind by a tunnel
+    # removed outside this worker is retired, and the new tunnel gets a fresh
+    # row so list fingerprints keyed on ids see the change
+    retire_stale = update(VPNConfig).where(
+        VPNConfig.user_id == user_id,
+        VPNConfig.server_id == 1,
+        VPNConfig.is_active == True
+    ).values(is_active=False)
+    
+    with SessionLocal() as db:
+        db.execute(retire_stale)
+        # A concurrent save that slips in between trips the unique index and fails loudly
+        config_id = db.execute(
+            insert(VPNConfig).values(
+                user_id=user_id,
+                server_id=1,  # Default server ID for wg-easy
+                public_key=tunnel_data['public_key'],
+                private_key="managed_by_wg_easy",  # Not stored locally
+                allocated_ip=tunnel_data['address'],
+                config_content=tunnel_data['config_content'],
+                is_active=True
+            ).returning(VPNConfig.id)
+        ).scalar_one()
+        db.commit()
+    
+    cache.delete(user_info_key(user_id))
+    return config_id
+
+def deactivate_tunnel_record(user_id: int) -> bool:
+    # Flipped in place; loading the row would drag config_content over the wire
+    active_config_id = select(VPNConfig.id).where(
+        VPNConfig.user_id == user_id,
+        VPNConfig.is_active == True
+    ).limit(1).scalar_subquery()
+    
+    with SessionLocal() as db:
+        deactivated = db.execute(
+            update(VPNConfig)
+            .where(VPNConfig.id == active_config_id)
+            .values(is_active=False)
+            .returning(VPNConfig.id)
+        ).first()
+        
+        if deactivated is None:
+            return False
+        
+        db.commit()
+    
+    cache.delete(user_info_key(user_id))
+    return True
+
+def deactivate_tunnel_records_bulk(user_ids: List[int]) -> int:
+    with SessionLocal() as db:
+        result = db.execute(
+            update(VPNConfig)
+            .where(VPNConfig.user_id.in_(user_ids), VPNConfig.is_active == True)
+            .values(is_active=False)
         )
+        db.commit()
+    
+    cache.delete(*(user_info_key(user_id) for user_id in user_ids))
+    return result.rowcount
 
 @router.post("/tunnel/create", response_model=DynamicTunnelResponse)
 async def create_dynamic_tunnel(
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager),
+    tunnel: Tuple[bool, Optional[Dict], str] = Depends(get_current_tunnel)
 ):
     """
     Create a dynamic VPN tunnel for the current user.
     Automatically provisions a new WireGuard client on the wg-easy panel.
     """
-    try:
-        logger.info(f"Creating dynamic tunnel for user {current_user.username} (ID: {current_user.id})")
-        
+    logger.info(f"Creating dynamic tunnel for user {current_user.username} (ID: {current_user.id})")
+    
+    # One create at a time per user, so a double submit can't provision two clients
+    async with tunnel_manager.user_lock(current_user.id):
         # Check if user already has an active tunnel
-        has_tunnel, tunnel_info, status_msg = await tunnel_manager.get_user_tunnel_status(current_user.id)
+        has_tunnel, tunnel_info, status_msg = tunnel
+        if not has_tunnel and current_user.id in tunnel_manager.active_tunnels:
+            # A concurrent create for this user finished while we waited
+            has_tunnel, tunnel_info, status_msg = await tunnel_manager.get_user_tunnel_status(current_user.id)
         
         if has_tunnel:
             logger.info(f"User {current_user.username} already has an active tunnel")
@@ -103,270 +183,206 @@ async def create_dynamic_tunnel(
         
         # Save tunnel info to database for tracking
         try:
-            vpn_config = VPNConfig(
-                user_id=current_user.id,
-                server_id=1,  # Default server ID for wg-easy
-                public_key=tunnel_data['public_key'],
-                private_key="managed_by_wg_easy",  # Not stored locally
-                allocated_ip=tunnel_data['address'],
-                config_content=tunnel_data['config_content'],
-                is_active=True
-            )
-            
-            db.add(vpn_config)
-            db.commit()
-            db.refresh(vpn_config)
-            
-            logger.info(f"Saved tunnel info to database: config_id={vpn_config.id}")
+            config_id = await run_in_threadpool(save_tunnel_record, current_user.id, tunnel_data)
+            logger.info(f"Saved tunnel info to database: config_id={config_id}")
             
         except Exception as db_error:
-            logger.warning(f"Failed to save tunnel to database: {db_error}")
-            # Don't fail the request if database save fails
-        
-        # Schedule automatic cleanup after user disconnects
-        background_tasks.add_task(schedule_tunnel_cleanup, current_user.id)
-        
-        logger.info(f"Successfully created dynamic tunnel for user {current_user.username}")
-        
-        return DynamicTunnelResponse(
-            status="success",
-            message="Dynamic VPN tunnel created successfully",
-            data={
-                "tunnel_exists": True,
-                "tunnel_info": {
-                    "client_id": tunnel_data['client_id'],
-                    "client_name": tunnel_data['client_name'],
-                    "address": tunnel_data['address'],
-                    "public_key": tunnel_data['public_key'],
-                    "created_at": tunnel_data['created_at'],
-                    "enabled": tunnel_data['enabled']
-                },
-                "config_content": tunnel_data['config_content'],
-                "qr_code": tunnel_data['qr_code']
-            }
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error creating tunnel for user {current_user.username}: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred while creating the VPN tunnel"
-        )
+            logger.error(f"Failed to save tunnel for user {current_user.username}: {db_error}")
+            # An unrecorded client would be invisible to the config endpoints
+            # and to cleanup; take it back off the panel and report the failure
+            removed, remove_msg = await tunnel_manager.destroy_user_tunnel(current_user.id)
+            if not removed:
+                logger.error(f"Failed to remove unrecorded tunnel for user {current_user.username}: {remove_msg}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create VPN tunnel: could not record it"
+            )
+    
+    logger.info(f"Successfully created dynamic tunnel for user {current_user.username}")
+    
+    return DynamicTunnelResponse(
+        status="success",
+        message="Dynamic VPN tunnel created successfully",
+        data={
+            "tunnel_exists": True,
+            "tunnel_info": {
+                "client_id": tunnel_data['client_id'],
+                "client_name": tunnel_data['client_name'],
+                "address": tunnel_data['address'],
+                "public_key": tunnel_data['public_key'],
+                "created_at": tunnel_data['created_at'],
+                "enabled": tunnel_data['enabled']
+            },
+            "config_content": tunnel_data['config_content'],
+            "qr_code": tunnel_data['qr_code']
+        }
+    )
 
 @router.delete("/tunnel/destroy")
 async def destroy_dynamic_tunnel(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager)
 ):
     """
     Destroy the current user's VPN tunnel.
     Removes the WireGuard client from the wg-easy panel.
     """
-    try:
-        logger.info(f"Destroying tunnel for user {current_user.username} (ID: {current_user.id})")
-        
-        # Destroy the tunnel
-        success, message = await tunnel_manager.destroy_user_tunnel(current_user.id)
-        
-        if not success and "no active tunnel" not in message.lower():
-            logger.error(f"Failed to destroy tunnel for user {current_user.username}: {message}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to destroy VPN tunnel: {message}"
-            )
-        
-        # Clean up database record
-        try:
-            vpn_config = db.query(VPNConfig).filter(
-                VPNConfig.user_id == current_user.id,
-                VPNConfig.is_active == True
-            ).first()
-            
-            if vpn_config:
-                vpn_config.is_active = False
-                db.commit()
-                logger.info(f"Deactivated database record for user {current_user.username}")
-                
-        except Exception as db_error:
-            logger.warning(f"Failed to update database: {db_error}")
-        
-        logger.info(f"Successfully destroyed tunnel for user {current_user.username}")
-        
-        return {
-            "status": "success",
-            "message": "VPN tunnel destroyed successfully",
-            "data": {
-                "tunnel_destroyed": True,
-                "destroyed_at": datetime.utcnow().isoformat()
-            }
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error destroying tunnel for user {current_user.username}: {e}")
+    logger.info(f"Destroying tunnel for user {current_user.username} (ID: {current_user.id})")
+    
+    # Destroy the tunnel
+    success, message = await tunnel_manager.destroy_user_tunnel(current_user.id)
+    
+    if not success and "no active tunnel" not in message.lower():
+        logger.error(f"Failed to destroy tunnel for user {current_user.username}: {message}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An unexpected error occurred while destroying the VPN tunnel"
+            detail=f"Failed to destroy VPN tunnel: {message}"
         )
+    
+    # Clean up database record
+    try:
+        if await run_in_threadpool(deactivate_tunnel_record, current_user.id):
+            logger.info(f"Deactivated database record for user {current_user.username}")
+            
+    except Exception as db_error:
+        logger.warning(f"Failed to update database: {db_error}")
+    
+    logger.info(f"Successfully destroyed tunnel for user {current_user.username}")
+    
+    return {
+        "status": "success",
+        "message": "VPN tunnel destroyed successfully",
+        "data": {
+            "tunnel_destroyed": True,
+            "destroyed_at": datetime.utcnow()
+        }
+    }
 
 @router.get("/tunnel/status")
-async def get_tunnel_status(current_user: User = Depends(get_current_user)):
+async def get_tunnel_status(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    tunnel: Tuple[bool, Optional[Dict], str] = Depends(get_current_tunnel)
+):
     """
     Get the current user's tunnel status.
     """
-    try:
-        has_tunnel, tunnel_info, status_msg = await tunnel_manager.get_user_tunnel_status(current_user.id)
-        
-        return {
-            "status": "success",
-            "message": status_msg,
-            "data": {
-                "has_active_tunnel": has_tunnel,
-                "tunnel_info": tunnel_info,
-                "checked_at": datetime.utcnow().isoformat()
-            }
+    has_tunnel, tunnel_info, status_msg = tunnel
+    
+    # Client timestamps are synthesized per listing, so only the fields that
+    # actually change between polls go into the tag
+    client_id = tunnel_info['client_id'] if tunnel_info else None
+    enabled = tunnel_info['enabled'] if tunnel_info else None
+    etag = make_etag("tunnel", has_tunnel, client_id, enabled, status_msg)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    response.headers["ETag"] = etag
+    return {
+        "status": "success",
+        "message": status_msg,
+        "data": {
+            "has_active_tunnel": has_tunnel,
+            "tunnel_info": tunnel_info,
+            "checked_at": datetime.utcnow()
         }
-        
-    except Exception as e:
-        logger.error(f"Error getting tunnel status for user {current_user.username}: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get tunnel status"
-        )
+    }
 
 @router.get("/tunnel/config")
-async def get_tunnel_config(current_user: User = Depends(get_current_user)):
+async def get_tunnel_config(
+    current_user: User = Depends(get_current_user),
+    wg_easy_manager: WgEasyManager = Depends(get_wg_easy_manager),
+    tunnel: Tuple[bool, Optional[Dict], str] = Depends(get_current_tunnel)
+):
     """
     Get the current user's tunnel configuration and QR code.
     """
-    try:
-        # Check if user has an active tunnel
-        has_tunnel, tunnel_info, status_msg = await tunnel_manager.get_user_tunnel_status(current_user.id)
-        
-        if not has_tunnel:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No active VPN tunnel found. Create a tunnel first."
-            )
-        
-        client_id = tunnel_info['client_id']
-        
-        # Get configuration
-        config_success, config_content, config_msg = wg_easy_manager.get_client_config(client_id)
-        if not config_success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to get configuration: {config_msg}"
-            )
-        
-        # Get QR code
-        qr_success, qr_code, qr_msg = wg_easy_manager.get_client_qr_code(client_id)
-        
-        return {
-            "status": "success",
-            "message": "Configuration retrieved successfully",
-            "data": {
-                "config_content": config_content,
-                "qr_code": qr_code if qr_success else None,
-                "tunnel_info": tunnel_info,
-                "downloaded_at": datetime.utcnow().isoformat()
-            }
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting config for user {current_user.username}: {e}")
+    # Check if user has an active tunnel
+    has_tunnel, tunnel_info, status_msg = tunnel
+    
+    if not has_tunnel:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active VPN tunnel found. Create a tunnel first."
+        )
+    
+    client_id = tunnel_info['client_id']
+    
+    # Fetch configuration and QR code concurrently
+    (config_success, config_content, config_msg), (qr_success, qr_code, qr_msg) = await asyncio.gather(
+        wg_easy_manager.get_client_config(client_id),
+        wg_easy_manager.get_client_qr_code(client_id)
+    )
+    if not config_success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get tunnel configuration"
+            detail=f"Failed to get configuration: {config_msg}"
         )
+    
+    return {
+        "status": "success",
+        "message": "Configuration retrieved successfully",
+        "data": {
+            "config_content": config_content,
+            "qr_code": qr_code if qr_success else None,
+            "tunnel_info": tunnel_info,
+            "downloaded_at": datetime.utcnow()
+        }
+    }
 
 @router.post("/tunnel/toggle")
-async def toggle_tunnel(current_user: User = Depends(get_current_user)):
+async def toggle_tunnel(
+    current_user: User = Depends(get_current_user),
+    wg_easy_manager: WgEasyManager = Depends(get_wg_easy_manager),
+    tunnel: Tuple[bool, Optional[Dict], str] = Depends(get_current_tunnel)
+):
     """
     Enable or disable the current user's tunnel.
     """
-    try:
-        # Check if user has an active tunnel
-        has_tunnel, tunnel_info, status_msg = await tunnel_manager.get_user_tunnel_status(current_user.id)
-        
-        if not has_tunnel:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No active VPN tunnel found"
-            )
-        
-        client_id = tunnel_info['client_id']
-        current_enabled = tunnel_info['enabled']
-        
-        # Toggle the tunnel
-        if current_enabled:
-            success, message = wg_easy_manager.disable_client(client_id)
-            action = "disabled"
-        else:
-            success, message = wg_easy_manager.enable_client(client_id)
-            action = "enabled"
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to {action} tunnel: {message}"
-            )
-        
-        logger.info(f"Tunnel {action} for user {current_user.username}")
-        
-        return {
-            "status": "success",
-            "message": f"Tunnel {action} successfully",
-            "data": {
-                "enabled": not current_enabled,
-                "action": action,
-                "toggled_at": datetime.utcnow().isoformat()
-            }
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error toggling tunnel for user {current_user.username}: {e}")
+    # Check if user has an active tunnel
+    has_tunnel, tunnel_info, status_msg = tunnel
+    
+    if not has_tunnel:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active VPN tunnel found"
+        )
+    
+    client_id = tunnel_info['client_id']
+    current_enabled = tunnel_info['enabled']
+    
+    # Toggle the tunnel
+    if current_enabled:
+        success, message = await wg_easy_manager.disable_client(client_id)
+        action = "disabled"
+    else:
+        success, message = await wg_easy_manager.enable_client(client_id)
+        action = "enabled"
+    
+    if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to toggle tunnel"
+            detail=f"Failed to {action} tunnel: {message}"
         )
-
-# Background task functions
-async def schedule_tunnel_cleanup(user_id: int):
-    """
-    Schedule automatic cleanup of inactive tunnels.
-    This runs in the background and cleans up tunnels after a delay.
-    """
-    try:
-        # Wait for 5 minutes before starting cleanup checks
-        await asyncio.sleep(300)
-        
-        # Check periodically if tunnel is still active
-        for _ in range(12):  # Check for 1 hour (12 * 5 minutes)
-            has_tunnel, tunnel_info, _ = await tunnel_manager.get_user_tunnel_status(user_id)
-            
-            if not has_tunnel:
-                logger.info(f"Tunnel for user {user_id} was already cleaned up")
-                return
-            
-            # TODO: Add logic to check if client is actually connected
-            # For now, we'll just wait and let manual cleanup handle it
-            await asyncio.sleep(300)  # Wait 5 minutes
-        
-        logger.info(f"Automatic cleanup period completed for user {user_id}")
-        
-    except Exception as e:
-        logger.error(f"Error in tunnel cleanup task for user {user_id}: {e}")
+    
+    logger.info(f"Tunnel {action} for user {current_user.username}")
+    
+    return {
+        "status": "success",
+        "message": f"Tunnel {action} successfully",
+        "data": {
+            "enabled": not current_enabled,
+            "action": action,
+            "toggled_at": datetime.utcnow()
+        }
+    }
 
 @router.post("/admin/cleanup")
-async def cleanup_inactive_tunnels(current_user: User = Depends(get_current_user)):
+async def cleanup_inactive_tunnels(
+    current_user: User = Depends(get_current_user),
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager)
+):
     """
     Manual cleanup of inactive tunnels (admin function).
     """
@@ -376,27 +392,81 @@ async def cleanup_inactive_tunnels(current_user: User = Depends(get_current_user
             detail="Admin access required"
         )
     
-    try:
-        cleanup_count = await tunnel_manager.cleanup_inactive_tunnels()
-        
-        return {
-            "status": "success",
-            "message": f"Cleaned up {cleanup_count} inactive tunnels",
-            "data": {
-                "cleaned_up_count": cleanup_count,
-                "cleanup_at": datetime.utcnow().isoformat()
-            }
+    cleanup_count = await tunnel_manager.cleanup_inactive_tunnels()
+    
+    return {
+        "status": "success",
+        "message": f"Cleaned up {cleanup_count} inactive tunnels",
+        "data": {
+            "cleaned_up_count": cleanup_count,
+            "cleanup_at": datetime.utcnow()
         }
-        
-    except Exception as e:
-        logger.error(f"Error during manual cleanup: {e}")
+    }
+
+async def load_tunnel_list(wg_easy_manager: WgEasyManager, tunnel_manager: DynamicTunnelManager) -> bytes:
+    success, clients, message = await wg_easy_manager.list_clients()
+    
+    if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to cleanup inactive tunnels"
+            detail=f"Failed to get tunnel list: {message}"
+        )
+    
+    # Validate and dump every client in one pydantic-core pass
+    tunnel_list = TUNNEL_LIST_ADAPTER.dump_python(
+        TUNNEL_LIST_ADAPTER.validate_python(clients, from_attributes=True),
+        mode="json"
+    )
+    
+    # Encoded once per cache window; every hit in that window sends these bytes as-is
+    return orjson.dumps({
+        "status": "success",
+        "message": f"Found {len(tunnel_list)} tunnels",
+        "data": {
+            "tunnels": tunnel_list,
+            "total_count": len(tunnel_list),
+            "active_tunnels": tunnel_manager.get_active_tunnel_count(),
+            "listed_at": datetime.utcnow()
+        }
+    })
+
+@router.post("/admin/tunnels/destroy")
+async def destroy_tunnels_bulk(
+    request: TunnelBulkDestroyRequest,
+    current_user: User = Depends(get_current_user),
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager)
+):
+    """
+    Destroy several users' tunnels at once (admin function).
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
         )
+    
+    user_ids = list(dict.fromkeys(request.user_ids))
+    # Panel deletes run concurrently; the DB side is a single UPDATE
+    destroyed = await tunnel_manager.destroy_many(user_ids)
+    deactivated = await run_in_threadpool(deactivate_tunnel_records_bulk, destroyed) if destroyed else 0
+    
+    return {
+        "status": "success",
+        "message": f"Destroyed tunnels for {len(destroyed)} of {len(user_ids)} users",
+        "data": {
+            "destroyed_user_ids": destroyed,
+            "failed_user_ids": sorted(set(user_ids) - set(destroyed)),
+            "deactivated_configs": deactivated,
+            "destroyed_at": datetime.utcnow()
+        }
+    }
 
 @router.get("/admin/tunnels")
-async def list_all_tunnels(current_user: User = Depends(get_current_user)):
+async def list_all_tunnels(
+    current_user: User = Depends(get_current_user),
+    wg_easy_manager: WgEasyManager = Depends(get_wg_easy_manager),
+    tunnel_manager: DynamicTunnelManager = Depends(get_tunnel_manager)
+):
     """
     List all active tunnels (admin function).
     """
@@ -406,77 +476,147 @@ async def list_all_tunnels(current_user: User = Depends(get_current_user)):
             detail="Admin access required"
         )
     
-    try:
-        success, clients, message = wg_easy_manager.list_clients()
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to get tunnel list: {message}"
-            )
-        
-        tunnel_list = []
-        for client in clients:
-            tunnel_list.append({
-                "client_id": client.id,
-                "name": client.name,
-                "enabled": client.enabled,
-                "address": client.address,
-                "public_key": client.public_key,
-                "created_at": client.created_at.isoformat(),
-                "updated_at": client.updated_at.isoformat()
-            })
-        
-        return {
-            "status": "success",
-            "message": f"Found {len(tunnel_list)} tunnels",
-            "data": {
-                "tunnels": tunnel_list,
-                "total_count": len(tunnel_list),
-                "active_tunnels": tunnel_manager.get_active_tunnel_count(),
-                "listed_at": datetime.utcnow().isoformat()
-            }
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error listing tunnels: {e}")
+    body = await tunnel_list_cache.get(lambda: load_tunnel_list(wg_easy_manager, tunnel_manager))
+    return Response(content=body, media_type="application/json")
+
+def get_owned_config(db: Session, config_id: int, user_id: int) -> VPNConfig:
+    vpn_config = db.get(VPNConfig, config_id)
+    
+    # Ownership is re-checked here so other users' configs read as missing
+    if vpn_config is None or vpn_config.user_id != user_id or not vpn_config.is_active:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to list tunnels"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="VPN configuration not found"
         )
+    return vpn_config
+
+@router.get("/config/{config_id}/status")
+def get_config_status(config_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Current handshake and traffic counters for a config; prefer /stream over polling this"""
+    vpn_config = get_owned_config(db, config_id, current_user.id)
+    peer = connection_monitor.get_peer_status(vpn_config.public_key)
+    return connection_monitor.peer_event(vpn_config.public_key, peer)
+
+@router.post("/configs/status")
+def get_configs_status(request: ConfigStatusRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Status of several of the user's configs from a single WireGuard dump"""
+    configs = db.query(VPNConfig.id, VPNConfig.public_key).filter(
+        VPNConfig.id.in_(request.config_ids),
+        VPNConfig.user_id == current_user.id,
+        VPNConfig.is_active == True
+    ).all()
+    
+    peers = connection_monitor.bulk_check(config.public_key for config in configs)
+    return [
+        {"config_id": config.id, **connection_monitor.peer_event(config.public_key, peers[config.public_key])}
+        for config in configs
+    ]
+
+@router.get("/config/{config_id}/stream")
+async def stream_config_status(config_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Server-sent events with the config's status, pushed whenever the
+    connection monitor sees its handshake or counters change, or polled
+    every STATUS_STREAM_KEEPALIVE seconds while the monitor is stopped.
+    """
+    vpn_config = await run_in_threadpool(get_owned_config, db, config_id, current_user.id)
+    public_key = vpn_config.public_key
+    # The stream can stay open for hours; don't hold a pool connection for it.
+    # Closing rolls back over the wire, so keep it off the event loop too.
+    await run_in_threadpool(db.close)
+    
+    async def events():
+        async for event in connection_monitor.subscribe(public_key, STATUS_STREAM_KEEPALIVE):
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Legacy endpoints for backward compatibility
 @router.get("/configs", response_model=List[VPNConfigResponse])
-def get_user_configs_legacy(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Legacy endpoint - get user configs from database"""
-    configs = db.query(VPNConfig).filter(
+def get_user_configs_legacy(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_CONFIGS_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Legacy endpoint - get user configs from database, newest first"""
+    # VPNConfigResponse nests the server; join it into the same query.
+    # Only the response's columns are fetched, leaving out the key material.
+    # Not cached: config_content embeds the client's private key.
+    query = db.query(VPNConfig).options(
+        load_only(
+            VPNConfig.id, VPNConfig.server_id, VPNConfig.allocated_ip,
+            VPNConfig.config_content, VPNConfig.is_active, VPNConfig.created_at
+        ),
+        joinedload(VPNConfig.server).load_only(
+            Server.id, Server.name, Server.location, Server.endpoint, Server.port,
+            Server.is_active, Server.created_at, Server.panel_url
+        )
+    ).filter(
         VPNConfig.user_id == current_user.id,
         VPNConfig.is_active == True
-    ).all()
-    return configs
+    ).order_by(VPNConfig.id.desc()).offset(offset)
+    # Without a limit the whole list is returned as before
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
-@router.get("/config/{config_id}/download", response_model=VPNConfigFile)
-def download_config_legacy(config_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Legacy endpoint - download config file"""
-    vpn_config = db.query(VPNConfig).filter(
+def load_config_file(db: Session, config_id: int, user_id: int) -> Tuple[str, str]:
+    """(config_content, allocated_ip) of one of the user's active configs"""
+    vpn_config = db.query(VPNConfig.config_content, VPNConfig.allocated_ip).filter(
         VPNConfig.id == config_id,
-        VPNConfig.user_id == current_user.id,
+        VPNConfig.user_id == user_id,
         VPNConfig.is_active == True
     ).first()
     
-    if not vpn_config:
+    if vpn_config is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="VPN configuration not found"
         )
     
-    qr_code = generate_qr_code(vpn_config.config_content)
+    config_content, allocated_ip = vpn_config
+    return config_content, allocated_ip
+
+@router.get("/config/{config_id}/download", response_model=VPNConfigFile)
+def download_config_legacy(config_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Legacy endpoint - download config file"""
+    config_content, allocated_ip = load_config_file(db, config_id, current_user.id)
+    qr_code = cached_qr_code(config_content)
     
     return {
-        "config_content": vpn_config.config_content,
+        "config_content": config_content,
         "qr_code": qr_code,
         "server_info": {"name": "wg-easy Server"},
-        "connection_info": {"address": vpn_config.allocated_ip}
-    }
\ No newline at end of file
+        "connection_info": {"address": allocated_ip}
+    }
+
+@router.get("/config/{config_id}/conf")
+def download_config_file(config_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """The WireGuard config as a plain .conf file, ready to import"""
+    config_content, _ = load_config_file(db, config_id, current_user.id)
+    return PlainTextResponse(
+        config_content,
+        headers={
+            "Content-Disposition": f'attachment; filename="wg{config_id}.conf"',
+            # Carries the client's private key
+            "Cache-Control": "no-store"
+        }
+    )
+
+@router.get("/config/{config_id}/qr.png")
+def download_config_qr(config_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """The config's QR code as raw PNG, without the base64 inflation of /download"""
+    config_content, _ = load_config_file(db, config_id, current_user.id)
+    return Response(
+        content=cached_qr_png(config_content),
+        media_type="image/png",
+        headers={"Cache-Control": "no-store"}
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, validator, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -19,7 +19,8 @@ class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=20, pattern="^[a-zA-Z0-9_]+$")
     email: EmailStr
 
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
         if not v.replace('_', '').isalnum():
             raise ValueError('Username can only contain letters, numbers, and underscores')
@@ -28,7 +29,8 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str = Field(..., min_length=6, max_length=50)
 
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password(cls, v):
         if len(v) < 6:
             raise ValueError('Password must be at least 6 characters long')
@@ -44,8 +46,7 @@ class UserResponse(UserBase):
     is_admin: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserLogin(BaseModel):
     username: str = Field(..., min_length=3)
@@ -73,6 +74,20 @@ class TunnelInfo(BaseModel):
     created_at: str = Field(..., description="Creation timestamp")
     updated_at: Optional[str] = Field(None, description="Last update timestamp")
 
+class TunnelBulkDestroyRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+class TunnelListItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    client_id: str = Field(..., validation_alias="id")
+    name: str
+    enabled: bool
+    address: str
+    public_key: str
+    created_at: datetime
+    updated_at: datetime
+
 class DynamicTunnelData(BaseModel):
     tunnel_exists: bool = Field(..., description="Whether tunnel exists")
     tunnel_info: Optional[TunnelInfo] = Field(None, description="Tunnel information")
@@ -97,7 +112,8 @@ class ServerCreateFromPanel(BaseModel):
     password: str = Field(..., min_length=1)
     location: str = Field(default="Unknown Location", max_length=50)
 
-    @validator('panel_url')
+    @field_validator('panel_url')
+    @classmethod
     def validate_panel_url(cls, v):
         if not v.startswith(('http://', 'https://')):
             raise ValueError('Panel URL must start with http:// or https://')
@@ -108,9 +124,10 @@ class ServerResponse(ServerBase):
     is_active: bool
     created_at: datetime
     panel_url: Optional[str] = None
+    # Set to "pending" on create while the IP pool is still being populated
+    provisioning_status: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class VPNConfigCreate(BaseModel):
     server_id: int = Field(..., gt=0)
@@ -124,8 +141,10 @@ class VPNConfigResponse(BaseModel):
     created_at: datetime
     server: ServerResponse
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class ConfigStatusRequest(BaseModel):
+    config_ids: List[int] = Field(..., min_length=1, max_length=100)
 
 class VPNConfigFile(BaseModel):
     config_content: str
@@ -142,16 +161,14 @@ class UsageLogResponse(BaseModel):
     session_end: Optional[datetime]
     duration_minutes: Optional[int] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AdminUserResponse(UserResponse):
     vpn_configs: List[VPNConfigResponse] = []
     total_data_used: int = 0
     last_connection: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ConnectionStatsResponse(BaseModel):
     total_users: int
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+import redis
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class RedisCache:
+    def __init__(self, url: Optional[str]):
+        self.client: Optional[redis.Redis] = None
+        self.hits = 0
+        self.misses = 0
+
+        if url:
+            self.client = redis.Redis.from_url(
+                url,
+                decode_responses=True,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    def get_json(self, key: str) -> Optional[Any]:
+        if not self.client:
+            return None
+
+        try:
+            raw = self.client.get(key)
+        except redis.RedisError as e:
+            # A cache outage must never fail the request; fall through to the DB
+            logger.warning("Cache read failed for %s: %s", key, e)
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(raw)
+
+    def get_many_json(self, *keys: str) -> List[Optional[Any]]:
+        if not self.client:
+            return [None] * len(keys)
+
+        try:
+            raw_values = self.client.mget(keys)
+        except redis.RedisError as e:
+            logger.warning("Cache read failed for %s: %s", keys, e)
+            return [None] * len(keys)
+
+        values = []
+        for raw in raw_values:
+            if raw is None:
+                self.misses += 1
+                values.append(None)
+            else:
+                self.hits += 1
+                values.append(json.loads(raw))
+        return values
+
+    def set_json(self, key: str, value: Any, ttl: int):
+        if not self.client:
+            return
+
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            # An unserializable value is a bug to log, not a reason to fail the request
+            logger.error("Cache value for %s is not JSON serializable: %s", key, e)
+            return
+
+        try:
+            self.client.setex(key, ttl, payload)
+        except redis.RedisError as e:
+            logger.warning("Cache write failed for %s: %s", key, e)
+
+    def set_many_json(self, values: Dict[str, Any], ttl: int):
+        if not self.client or not values:
+            return
+
+        try:
+            payloads = {key: json.dumps(value) for key, value in values.items()}
+        except (TypeError, ValueError) as e:
+            logger.error("Cache values for %s are not JSON serializable: %s", list(values), e)
+            return
+
+        try:
+            # One round-trip for the whole batch
+            pipeline = self.client.pipeline(transaction=False)
+            for key, payload in payloads.items():
+                pipeline.setex(key, ttl, payload)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning("Cache write failed for %s: %s", list(values), e)
+
+    def delete(self, *keys: str):
+        if not self.client or not keys:
+            return
+
+        try:
+            self.client.delete(*keys)
+        except redis.RedisError as e:
+            logger.warning("Cache invalidation failed for %s: %s", keys, e)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def user_info_key(user_id: int) -> str:
+    return f"me:{user_id}"
+
+def user_key(username: str) -> str:
+    return f"user:{username}"
+
+def revoked_token_key(token: str) -> str:
+    # Hash so raw bearer tokens never sit in Redis
+    return f"revoked:{hashlib.sha256(token.encode()).hexdigest()}"
+
+def server_list_key(etag: str) -> str:
+    # The ETag already covers the row set and the query parameters
+    return "servers:" + etag.strip('W/"')
+
+def qr_code_key(config_content: str) -> str:
+    # Content-addressed, so an entry can never go stale
+    return f"qr:{hashlib.sha256(config_content.encode()).hexdigest()}"
+
+def peer_status_key(public_key: str) -> str:
+    return f"wg:peer:{public_key}"
+
+CONNECTION_STATS_KEY = "conn:stats"
+
+cache = RedisCache(settings.REDIS_URL)
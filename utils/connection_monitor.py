@@ -1,16 +1,23 @@
+import asyncio
 import subprocess
 import time
 import threading
 import logging
-from typing import Dict, Set, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Set, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from models import VPNConfig, UsageLog
 from utils.server_manager import server_manager
+from utils.cache import cache, peer_status_key
+from config import settings
 
 logger = logging.getLogger(__name__)
 
+SUBSCRIBER_QUEUE_SIZE = 16
+# Bursts of status lookups within this window share one `wg show` dump
+SNAPSHOT_MAX_AGE = 1.0
+
 @dataclass
 class PeerStatus:
     public_key: str
@@ -21,6 +28,34 @@ class PeerStatus:
     is_connected: bool
     last_seen: datetime
 
+def _peer_to_cache(peer: Optional[PeerStatus]) -> dict:
+    # An empty entry records that the peer was absent from the dump
+    if peer is None:
+        return {}
+    return {
+        "public_key": peer.public_key,
+        "last_handshake": peer.last_handshake.isoformat() if peer.last_handshake else None,
+        "bytes_received": peer.bytes_received,
+        "bytes_sent": peer.bytes_sent,
+        "endpoint": peer.endpoint,
+        "is_connected": peer.is_connected,
+        "last_seen": peer.last_seen.isoformat()
+    }
+
+def _peer_from_cache(data: dict) -> Optional[PeerStatus]:
+    if not data:
+        return None
+    last_handshake = data["last_handshake"]
+    return PeerStatus(
+        public_key=data["public_key"],
+        last_handshake=datetime.fromisoformat(last_handshake) if last_handshake else None,
+        bytes_received=data["bytes_received"],
+        bytes_sent=data["bytes_sent"],
+        endpoint=data["endpoint"],
+        is_connected=data["is_connected"],
+        last_seen=datetime.fromisoformat(data["last_seen"])
+    )
+
 class ConnectionMonitor:
     def __init__(self):
         self.monitoring_active = False
@@ -28,6 +63,12 @@ class ConnectionMonitor:
         self.peer_status: Dict[str, PeerStatus] = {}
         self.disconnection_threshold = 300  # 5 minutes
         self.cleanup_enabled = True
+        # public key -> (event loop, queue) of each open status stream
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._subscribers_lock = threading.Lock()
+        self._snapshot: Dict[str, PeerStatus] = {}
+        self._snapshot_at = 0.0
+        self._snapshot_lock = threading.Lock()
         
     def get_active_peers(self) -> Dict[str, PeerStatus]:
         try:
@@ -43,6 +84,8 @@ class ConnectionMonitor:
                 return {}
             
             peers = {}
+            # Every peer in one dump shares the same observation time
+            now = datetime.utcnow()
             lines = result.stdout.strip().split('\n')
             
             for line in lines[1:]:  # Skip header
@@ -66,7 +109,7 @@ class ConnectionMonitor:
                         except (ValueError, OverflowError):
                             pass
                     
-                    is_connected = self._is_peer_connected(last_handshake)
+                    is_connected = self._is_peer_connected(last_handshake, now)
                     
                     peers[public_key] = PeerStatus(
                         public_key=public_key,
@@ -75,7 +118,7 @@ class ConnectionMonitor:
                         bytes_sent=bytes_sent,
                         endpoint=endpoint,
                         is_connected=is_connected,
-                        last_seen=datetime.utcnow()
+                        last_seen=now
                     )
             
             return peers
@@ -84,26 +127,152 @@ class ConnectionMonitor:
             logger.error(f"Error getting active peers: {e}")
             return {}
     
-    def _is_peer_connected(self, last_handshake: Optional[datetime]) -> bool:
+    def _is_peer_connected(self, last_handshake: Optional[datetime], now: datetime) -> bool:
         if not last_handshake:
             return False
         
-        time_since_handshake = datetime.utcnow() - last_handshake
+        time_since_handshake = now - last_handshake
         return time_since_handshake.total_seconds() < self.disconnection_threshold
     
     def check_peer_connectivity(self, public_key: str) -> Optional[PeerStatus]:
-        peers = self.get_active_peers()
-        return peers.get(public_key)
+        return self._lookup_peers([public_key])[public_key]
+    
+    def get_peer_snapshot(self) -> Dict[str, PeerStatus]:
+        """All peers from a `wg show` dump at most SNAPSHOT_MAX_AGE seconds old"""
+        with self._snapshot_lock:
+            # Held across the dump so concurrent callers wait for it instead of spawning their own
+            if time.monotonic() - self._snapshot_at >= SNAPSHOT_MAX_AGE:
+                self._snapshot = self.get_active_peers()
+                self._snapshot_at = time.monotonic()
+            return self._snapshot
+    
+    def get_peer_status(self, public_key: str) -> Optional[PeerStatus]:
+        """Latest monitor snapshot for the peer; probes directly only when the monitor is off"""
+        return self.bulk_check([public_key]).get(public_key)
+    
+    def bulk_check(self, public_keys: Iterable[str]) -> Dict[str, Optional[PeerStatus]]:
+        if self.monitoring_active:
+            return {public_key: self.peer_status.get(public_key) for public_key in public_keys}
+        return self._lookup_peers(list(public_keys))
+    
+    def _lookup_peers(self, public_keys: List[str]) -> Dict[str, Optional[PeerStatus]]:
+        """Peers from the cross-worker cache, dumping `wg show` only for keys it lacks"""
+        if not public_keys:
+            return {}
+        
+        peers = {}
+        missing = []
+        cached = cache.get_many_json(*(peer_status_key(public_key) for public_key in public_keys))
+        for public_key, entry in zip(public_keys, cached):
+            if entry is None:
+                missing.append(public_key)
+            else:
+                peers[public_key] = _peer_from_cache(entry)
+        
+        if missing:
+            snapshot = self.get_peer_snapshot()
+            for public_key in missing:
+                peers[public_key] = snapshot.get(public_key)
+            cache.set_many_json(
+                {peer_status_key(public_key): _peer_to_cache(peers[public_key]) for public_key in missing},
+                settings.PEER_STATUS_CACHE_TTL
+            )
+        return peers
+    
+    @staticmethod
+    def peer_event(public_key: str, peer: Optional[PeerStatus]) -> Dict:
+        return {
+            "public_key": public_key,
+            "is_connected": bool(peer and peer.is_connected),
+            "last_handshake": peer.last_handshake.isoformat() if peer and peer.last_handshake else None,
+            "bytes_received": peer.bytes_received if peer else 0,
+            "bytes_sent": peer.bytes_sent if peer else 0,
+            "endpoint": peer.endpoint if peer else None
+        }
+    
+    async def subscribe(self, public_key: str, keepalive: float) -> AsyncIterator[Optional[Dict]]:
+        """Yield the peer's current status, then one event per change.
+        
+        Changes are pushed by the monitor thread while it runs; otherwise the
+        peer is probed every `keepalive` seconds. Yields None after `keepalive`
+        seconds without a change so callers can keep idle connections open.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        subscriber = (loop, queue)
+        
+        with self._subscribers_lock:
+            self._subscribers.setdefault(public_key, set()).add(subscriber)
+        
+        try:
+            # peer_status is empty until the monitor runs; probe like the status endpoint does
+            last_event = self.peer_event(public_key, await asyncio.to_thread(self.get_peer_status, public_key))
+            yield last_event
+            while True:
+                try:
+                    last_event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                    yield last_event
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+                
+                if not self.monitoring_active:
+                    # Nothing is publishing changes; poll for them instead
+                    event = self.peer_event(public_key, await asyncio.to_thread(self.get_peer_status, public_key))
+                    if event != last_event:
+                        last_event = event
+                        yield event
+                        continue
+                yield None
+        finally:
+            with self._subscribers_lock:
+                subscribers = self._subscribers.get(public_key)
+                if subscribers:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[public_key]
+    
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict):
+        # A slow reader only needs the newest state; drop the oldest event
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
     
-    def update_usage_stats(self, db: Session):
+    def _publish_changes(self, previous: Dict[str, PeerStatus], current: Dict[str, PeerStatus]):
+        with self._subscribers_lock:
+            watched = [(key, list(subscribers)) for key, subscribers in self._subscribers.items()]
+        
+        for public_key, subscribers in watched:
+            event = self.peer_event(public_key, current.get(public_key))
+            if event == self.peer_event(public_key, previous.get(public_key)):
+                continue
+            
+            for loop, queue in subscribers:
+                try:
+                    loop.call_soon_threadsafe(self._offer, queue, event)
+                except RuntimeError:
+                    # The subscriber's loop has shut down
+                    pass
+    
+    def update_usage_stats(self, db: Session, active_peers: Optional[Dict[str, PeerStatus]] = None):
         try:
-            active_peers = self.get_active_peers()
+            if active_peers is None:
+                active_peers = self.get_active_peers()
+            
+            # One IN query for every peer instead of a lookup per peer
+            configs_by_key = {}
+            if active_peers:
+                configs_by_key = {
+                    config.public_key: config
+                    for config in db.query(VPNConfig).filter(
+                        VPNConfig.public_key.in_(list(active_peers)),
+                        VPNConfig.is_active == True
+                    )
+                }
             
             for public_key, peer_status in active_peers.items():
-                vpn_config = db.query(VPNConfig).filter(
-                    VPNConfig.public_key == public_key,
-                    VPNConfig.is_active == True
-                ).first()
+                vpn_config = configs_by_key.get(public_key)
                 
                 if vpn_config:
                     usage_log = UsageLog(
@@ -122,24 +291,30 @@ class ConnectionMonitor:
             logger.error(f"Error updating usage stats: {e}")
             db.rollback()
     
-    def cleanup_disconnected_peers(self, db: Session):
+    def cleanup_disconnected_peers(self, db: Session, active_peers: Optional[Dict[str, PeerStatus]] = None):
         if not self.cleanup_enabled:
             return
             
         try:
-            active_configs = db.query(VPNConfig).filter(VPNConfig.is_active == True).all()
-            active_peers = self.get_active_peers()
+            # Servers are preloaded so tearing down several tunnels doesn't
+            # look each one's server up separately
+            active_configs = db.query(VPNConfig).options(
+                selectinload(VPNConfig.server)
+            ).filter(VPNConfig.is_active == True).all()
+            if active_peers is None:
+                active_peers = self.get_active_peers()
             
             disconnected_count = 0
+            now = datetime.utcnow()
             for config in active_configs:
                 peer_status = active_peers.get(config.public_key)
                 
                 if not peer_status or not peer_status.is_connected:
-                    time_since_created = datetime.utcnow() - config.created_at
+                    time_since_created = now - config.created_at
                     
                     if time_since_created.total_seconds() > self.disconnection_threshold:
                         if peer_status and peer_status.last_handshake:
-                            time_since_handshake = datetime.utcnow() - peer_status.last_handshake
+                            time_since_handshake = now - peer_status.last_handshake
                             if time_since_handshake.total_seconds() > self.disconnection_threshold:
                                 self._cleanup_peer(db, config)
                                 disconnected_count += 1
@@ -225,13 +400,17 @@ class ConnectionMonitor:
             try:
                 db = db_session_factory()
                 
-                self.update_usage_stats(db)
+                # One `wg show` snapshot serves the whole cycle
+                active_peers = self.get_active_peers()
+                
+                self.update_usage_stats(db, active_peers)
                 
                 if cycle_count % 5 == 0:  # Cleanup every 5 cycles
-                    self.cleanup_disconnected_peers(db)
+                    self.cleanup_disconnected_peers(db, active_peers)
                 
-                active_peers = self.get_active_peers()
-                self.peer_status.update(active_peers)
+                # Replace rather than merge so peers that went away read as gone
+                self._publish_changes(self.peer_status, active_peers)
+                self.peer_status = active_peers
                 
                 connected_count = sum(1 for peer in active_peers.values() if peer.is_connected)
                 logger.debug(f"Monitoring: {connected_count}/{len(active_peers)} peers connected")
@@ -0,0 +1,31 @@
+import hashlib
+from fastapi import Request, Response, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+def membership_fingerprint(db: Session, id_column, *criteria) -> tuple:
+    """Cheap summary of which rows are in a set; changes when a row enters or leaves it.
+
+    Rows rewritten in place keep their id and go unnoticed, so only use this for
+    sets whose rows are replaced (new row, old one filtered out) rather than updated.
+    """
+    return db.query(
+        func.count(id_column),
+        func.max(id_column),
+        func.coalesce(func.sum(id_column), 0)
+    ).filter(*criteria).one()
+
+def make_etag(*parts) -> str:
+    digest = hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
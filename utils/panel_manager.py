@@ -1,13 +1,20 @@
 import requests
 import json
 import re
+import hashlib
 import logging
+import time
 from typing import Dict, Optional, Tuple, List
 from dataclasses import dataclass
 from urllib.parse import urljoin, urlparse
+from config import settings
+from utils.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# How long a probe result is reused in-process before asking Redis/the panel again
+LOCAL_PROBE_TTL = 5.0
+
 @dataclass
 class PanelInfo:
     url: str
@@ -20,6 +27,7 @@ class PanelInfo:
 class WireGuardPanelManager:
     def __init__(self):
         self.panels: Dict[str, PanelInfo] = {}
+        self._probe_results: Dict[str, Tuple[float, Tuple[bool, str]]] = {}
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'WireGuard-VPN-Backend/1.0',
@@ -34,6 +42,12 @@ class WireGuardPanelManager:
             if not panel_url.startswith(('http://', 'https://')):
                 panel_url = f"http://{panel_url}"
             
+            existing = self.panels.get(panel_url)
+            if existing and existing.is_authenticated and existing.password == password:
+                # Already logged in with these credentials; skip the auth probing
+                existing.name = name
+                return True
+            
             panel_info = PanelInfo(url=panel_url, name=name, password=password)
             
             # Test panel connectivity and authentication
@@ -235,7 +249,31 @@ class WireGuardPanelManager:
             return None
     
     def test_panel_connection(self, panel_url: str) -> Tuple[bool, str]:
-        """Test connection to WireGuard panel"""
+        """Test connection to WireGuard panel, reusing a recent result if one is cached"""
+        now = time.monotonic()
+        local = self._probe_results.get(panel_url)
+        if local and local[0] > now:
+            return local[1]
+        
+        cache_key = f"panel:conn:{hashlib.sha1(panel_url.encode()).hexdigest()}"
+        cached = cache.get_json(cache_key)
+        if cached is not None:
+            result = (cached[0], cached[1])
+        else:
+            result = self._probe_panel(panel_url)
+            # Only successes are reused, so a panel that was just fixed is seen on the next check
+            if not result[0]:
+                return result
+            cache.set_json(cache_key, result, settings.PANEL_STATUS_CACHE_TTL)
+        
+        # Drop expired entries so panels that are no longer probed don't accumulate
+        self._probe_results = {
+            url: entry for url, entry in self._probe_results.items() if entry[0] > now
+        }
+        self._probe_results[panel_url] = (now + LOCAL_PROBE_TTL, result)
+        return result
+    
+    def _probe_panel(self, panel_url: str) -> Tuple[bool, str]:
         try:
             response = self.session.get(panel_url, timeout=10)
             
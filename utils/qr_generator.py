@@ -1,7 +1,43 @@
 import qrcode
 import io
 import base64
+import threading
+from collections import OrderedDict
 from PIL import Image
+from utils.cache import cache, qr_code_key
+from config import settings
+
+PNG_DATA_URI_PREFIX = "data:image/png;base64,"
+
+LOCAL_QR_CACHE_SIZE = 1024
+
+# Keyed by the content digest, so config text (and its private key) isn't kept as a key
+_local_qr_codes: "OrderedDict[str, str]" = OrderedDict()
+_local_qr_codes_lock = threading.Lock()
+
+# A config's content never changes, so repeat downloads can reuse its QR image:
+# from this process first, then from any worker that rendered it before
+def cached_qr_code(data: str) -> str:
+    key = qr_code_key(data)
+    with _local_qr_codes_lock:
+        qr_code = _local_qr_codes.get(key)
+        if qr_code is not None:
+            _local_qr_codes.move_to_end(key)
+            return qr_code
+    
+    qr_code = cache.get_json(key)
+    if qr_code is None:
+        qr_code = generate_qr_code(data)
+        cache.set_json(key, qr_code, settings.QR_CODE_CACHE_TTL)
+    
+    with _local_qr_codes_lock:
+        _local_qr_codes[key] = qr_code
+        if len(_local_qr_codes) > LOCAL_QR_CACHE_SIZE:
+            _local_qr_codes.popitem(last=False)
+    return qr_code
+
+def cached_qr_png(data: str) -> bytes:
+    return base64.b64decode(cached_qr_code(data)[len(PNG_DATA_URI_PREFIX):])
 
 def generate_qr_code(data: str) -> str:
     qr = qrcode.QRCode(
@@ -20,4 +56,4 @@ def generate_qr_code(data: str) -> str:
     buffer.seek(0)
     
     img_str = base64.b64encode(buffer.read()).decode()
-    return f"data:image/png;base64,{img_str}"
\ No newline at end of file
+    return f"{PNG_DATA_URI_PREFIX}{img_str}"
\ No newline at end of file
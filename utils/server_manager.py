@@ -5,9 +5,11 @@ import requests
 import logging
 from typing import Dict, Optional, Tuple
 from dataclasses import dataclass
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from models import Server, VPNConfig, IPAllocation
 from utils.wireguard import add_peer_to_server, remove_peer_from_server
+from utils.cache import cache, user_info_key
 import threading
 import json
 
@@ -156,12 +158,10 @@ class ServerManager:
         try:
             logger.info(f"Creating tunnel for user {user_id} on server {server.name}")
             
-            available_ip = db.query(IPAllocation).filter(
-                IPAllocation.server_id == server.id,
-                IPAllocation.is_allocated == False
-            ).first()
+            available_ip = IPAllocation.allocate(db, server.id)
             
             if not available_ip:
+                db.rollback()
                 logger.error(f"No available IP addresses for server {server.id}")
                 return False, "No available IP addresses for this server", None
             
@@ -185,6 +185,7 @@ class ServerManager:
                 logger.info(f"Direct peer addition result: {success}")
             
             if not success:
+                db.rollback()
                 logger.error("Failed to add peer to WireGuard server")
                 return False, "Failed to add peer to WireGuard server", None
             
@@ -210,11 +211,15 @@ class ServerManager:
             db.add(vpn_config)
             db.flush()
             
-            available_ip.is_allocated = True
-            available_ip.allocated_to = vpn_config.id
+            db.execute(
+                update(IPAllocation)
+                .where(IPAllocation.id == available_ip.id)
+                .values(allocated_to=vpn_config.id)
+            )
             
             db.commit()
             db.refresh(vpn_config)
+            cache.delete(user_info_key(user_id))
             
             logger.info(f"Tunnel created successfully with config ID: {vpn_config.id}")
             return True, "Tunnel created successfully", vpn_config
@@ -224,28 +229,38 @@ class ServerManager:
             logger.error(f"Error creating tunnel: {str(e)}")
             return False, f"Failed to create tunnel: {str(e)}", None
     
-    def destroy_tunnel_with_validation(self, db: Session, vpn_config: VPNConfig) -> Tuple[bool, str]:
+    def remove_peer(self, server: Optional[Server], public_key: str) -> bool:
+        """Remove a peer from its panel or local interface; touches no database state"""
         try:
-            server = db.query(Server).filter(Server.id == vpn_config.server_id).first()
-            
             if server and server.panel_url:
                 from utils.panel_manager import panel_manager
-                success = panel_manager.remove_peer_from_panel(server.panel_url, vpn_config.public_key)
-            else:
-                success = remove_peer_from_server(vpn_config.public_key)
+                return panel_manager.remove_peer_from_panel(server.panel_url, public_key)
+            return remove_peer_from_server(public_key)
+        except Exception as e:
+            logger.error(f"Error removing peer {public_key}: {str(e)}")
+            return False
+    
+    def release_config(self, db: Session, vpn_config: VPNConfig):
+        """Deactivate a config and free its IP; the caller commits"""
+        vpn_config.is_active = False
+        
+        db.execute(
+            update(IPAllocation)
+            .where(IPAllocation.allocated_to == vpn_config.id)
+            .values(is_allocated=False, allocated_to=None)
+        )
+    
+    def destroy_tunnel_with_validation(self, db: Session, vpn_config: VPNConfig) -> Tuple[bool, str]:
+        try:
+            # Uses the relationship so callers that preloaded servers skip the lookup
+            server = vpn_config.server
+            
+            success = self.remove_peer(server, vpn_config.public_key)
             
             if success:
-                vpn_config.is_active = False
-                
-                ip_allocation = db.query(IPAllocation).filter(
-                    IPAllocation.allocated_to == vpn_config.id
-                ).first()
-                
-                if ip_allocation:
-                    ip_allocation.is_allocated = False
-                    ip_allocation.allocated_to = None
-                
+                self.release_config(db, vpn_config)
                 db.commit()
+                cache.delete(user_info_key(vpn_config.user_id))
                 
                 return True, "Tunnel destroyed successfully"
             else:
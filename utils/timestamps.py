@@ -0,0 +1,17 @@
+import time
+from datetime import datetime, timezone
+
+REFRESH_INTERVAL = 0.1
+
+_expires_at = 0.0
+_cached_iso = ""
+
+def utc_now_iso() -> str:
+    """UTC ISO-8601 timestamp, reformatted at most every REFRESH_INTERVAL seconds"""
+    global _expires_at, _cached_iso
+
+    now = time.monotonic()
+    if now >= _expires_at:
+        _cached_iso = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        _expires_at = now + REFRESH_INTERVAL
+    return _cached_iso
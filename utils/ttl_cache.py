@@ -0,0 +1,26 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+class AsyncTTLValue:
+    """A single cached value, reloaded at most once per TTL however many callers miss together"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: Any = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if time.monotonic() < self._expires_at:
+            return self._value
+
+        async with self._lock:
+            # Whoever held the lock before us may have just refreshed it
+            if time.monotonic() < self._expires_at:
+                return self._value
+
+            # A loader that raises leaves the previous expiry in place, so errors aren't cached
+            self._value = await loader()
+            self._expires_at = time.monotonic() + self.ttl
+            return self._value
@@ -1,4 +1,3 @@
-import requests
 import json
 import logging
 import base64
@@ -8,10 +7,16 @@ from dataclasses import dataclass
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 import asyncio
+import weakref
 import aiohttp
 
 logger = logging.getLogger(__name__)
 
+# wg-easy rewrites its config and reloads WireGuard on every client change,
+# so bulk deletes are throttled and spaced to let its debounced save batch them
+BULK_DELETE_CONCURRENCY = 4
+BULK_DELETE_PACING = 0.25
+
 @dataclass
 class WgEasyClient:
     id: str
@@ -31,347 +36,298 @@ class WgEasyPeerStatus:
     is_connected: bool
 
 class WgEasyManager:
-    def __init__(self, panel_url: str, password: str):
+    def __init__(self, panel_url: str, password: str, timeout: float = 10.0, max_connections: int = 10):
         self.panel_url = panel_url.rstrip('/')
         self.password = password
-        self.session = None
+        self.timeout = timeout
+        self.max_connections = max_connections
         self.authenticated = False
-        self.client_session = None
+        self.client_session: Optional[aiohttp.ClientSession] = None
+        self._auth_lock: Optional[asyncio.Lock] = None
+        self._list_request: Optional[asyncio.Future] = None
         
-    def _get_sync_session(self) -> requests.Session:
-        if not self.session:
-            self.session = requests.Session()
-            self.session.headers.update({
-                'User-Agent': 'WireGuard-VPN-Backend/2.0',
-                'Content-Type': 'application/json'
-            })
-            self.session.timeout = 30
-        return self.session
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the running event loop; kept open so
+        # the keep-alive connections (and the panel's session cookie) are reused
+        if self.client_session is None or self.client_session.closed:
+            self.client_session = aiohttp.ClientSession(
+                base_url=self.panel_url,
+                headers={
+                    'User-Agent': 'WireGuard-VPN-Backend/2.0',
+                    'Content-Type': 'application/json'
+                },
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit_per_host=self.max_connections),
+                # wg-easy is usually addressed by IP, which the default jar ignores
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+            )
+            self.authenticated = False
+        return self.client_session
     
-    def _authenticate(self) -> bool:
-        try:
-            session = self._get_sync_session()
-            
-            # Create session with password
-            auth_data = {"password": self.password}
-            response = session.post(f"{self.panel_url}/api/session", json=auth_data)
-            
-            if response.status_code == 200:
-                self.authenticated = True
-                logger.info("Successfully authenticated with wg-easy panel")
-                return True
-            else:
-                logger.error(f"Authentication failed: HTTP {response.status_code}")
-                return False
-            
-        except Exception as e:
-            logger.error(f"Authentication error: {e}")
-            return False
+    async def warm_up(self, connections: int):
+        """Open keep-alive connections up front so the first requests skip the TCP/TLS handshake"""
+        session = self._get_session()
+        
+        async def ping():
+            try:
+                async with session.get("/api/session") as response:
+                    await response.read()
+            except Exception as e:
+                logger.debug(f"Panel warm-up request failed: {e}")
+        
+        # Concurrent, so each ping needs its own connection
+        await asyncio.gather(*(ping() for _ in range(min(connections, self.max_connections))))
     
-    def test_connection(self) -> Tuple[bool, str]:
-        try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, "Authentication failed - check password"
-            
-            session = self._get_sync_session()
-            
-            # Test the known working endpoint
+    async def close(self):
+        if self.client_session is not None and not self.client_session.closed:
+            await self.client_session.close()
+        self.client_session = None
+        self.authenticated = False
+    
+    async def _authenticate(self) -> bool:
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        
+        async with self._auth_lock:
             try:
-                response = session.get(f"{self.panel_url}/api/wireguard/client")
-                if response.status_code == 200:
-                    logger.info("Successfully connected using /api/wireguard/client endpoint")
-                    return True, "Successfully connected to wg-easy panel"
-                elif response.status_code == 401:
-                    # Re-authenticate and try again
-                    if self._authenticate():
-                        response = session.get(f"{self.panel_url}/api/wireguard/client")
-                        if response.status_code == 200:
-                            return True, "Successfully connected after re-authentication"
-                    return False, "Authentication failed after retry"
-                else:
-                    return False, f"API returned HTTP {response.status_code}"
+                session = self._get_session()
+                
+                # Create session with password
+                auth_data = {"password": self.password}
+                async with session.post("/api/session", json=auth_data) as response:
+                    if response.status == 200:
+                        self.authenticated = True
+                        logger.info("Successfully authenticated with wg-easy panel")
+                        return True
+                    else:
+                        logger.error(f"Authentication failed: HTTP {response.status}")
+                        return False
+                
             except Exception as e:
-                return False, f"Connection error: {str(e)}"
+                logger.error(f"Authentication error: {e}")
+                return False
+    
+    async def _request(self, method: str, path: str, **kwargs) -> Tuple[int, str]:
+        """Send a request to the panel, re-authenticating once on HTTP 401"""
+        if not self.authenticated and not await self._authenticate():
+            return 401, ""
+        
+        session = self._get_session()
+        async with session.request(method, path, **kwargs) as response:
+            status, body = response.status, await response.text()
+        
+        if status == 401:
+            self.authenticated = False
+            if await self._authenticate():
+                async with session.request(method, path, **kwargs) as response:
+                    status, body = response.status, await response.text()
+        
+        return status, body
+    
+    @staticmethod
+    def _parse_client(client_data: Dict, now: datetime) -> WgEasyClient:
+        return WgEasyClient(
+            id=client_data.get('id', ''),
+            name=client_data.get('name', ''),
+            enabled=client_data.get('enabled', True),
+            address=client_data.get('address', ''),
+            public_key=client_data.get('publicKey', ''),
+            created_at=now,
+            updated_at=now
+        )
+    
+    async def test_connection(self) -> Tuple[bool, str]:
+        try:
+            status, _ = await self._request("GET", "/api/wireguard/client")
+            if status == 200:
+                logger.info("Successfully connected using /api/wireguard/client endpoint")
+                return True, "Successfully connected to wg-easy panel"
+            elif status == 401:
+                return False, "Authentication failed - check password"
+            else:
+                return False, f"API returned HTTP {status}"
                 
-        except requests.exceptions.ConnectionError:
+        except aiohttp.ClientConnectionError:
             return False, "Cannot connect to wg-easy panel - check URL and network"
-        except requests.exceptions.Timeout:
+        except asyncio.TimeoutError:
             return False, "Connection timeout to wg-easy panel"
         except Exception as e:
             return False, f"Connection error: {str(e)}"
     
-    def create_client(self, name: str) -> Tuple[bool, Optional[WgEasyClient], str]:
+    async def create_client(self, name: str) -> Tuple[bool, Optional[WgEasyClient], str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, None, "Authentication failed"
-            
-            unique_name = f"{name}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
-            
-            session = self._get_sync_session()
+            now = datetime.now()
+            unique_name = f"{name}_{int(now.timestamp())}_{uuid.uuid4().hex[:8]}"
             
             # Use the correct endpoint for creating clients
             create_data = {"name": unique_name}
+            status, body = await self._request("POST", "/api/wireguard/client", json=create_data)
             
-            try:
-                response = session.post(f"{self.panel_url}/api/wireguard/client", json=create_data)
+            if status == 200:
+                response_data = json.loads(body)
                 
-                if response.status_code == 200:
-                    response_data = response.json()
+                if response_data.get("success"):
+                    # Client created successfully, now get the client list to find our new client
+                    # Not list_clients: a listing already in flight may predate the new client
+                    success, clients, _ = await self._fetch_clients()
+                    if success:
+                        # Find the newly created client by name
+                        new_client = next((c for c in clients if c.name == unique_name), None)
+                        if new_client:
+                            logger.info(f"Created WireGuard client: {unique_name} (ID: {new_client.id})")
+                            return True, new_client, "Client created successfully"
                     
-                    if response_data.get("success"):
-                        # Client created successfully, now get the client list to find our new client
-                        success, clients, _ = self.list_clients()
-                        if success:
-                            # Find the newly created client by name
-                            new_client = next((c for c in clients if c.name == unique_name), None)
-                            if new_client:
-                                logger.info(f"Created WireGuard client: {unique_name} (ID: {new_client.id})")
-                                return True, new_client, "Client created successfully"
-                        
-                        # If we can't find the client in the list, create a basic response
-                        wg_client = WgEasyClient(
-                            id="unknown",
-                            name=unique_name,
-                            enabled=True,
-                            address="",
-                            public_key="",
-                            created_at=datetime.now(),
-                            updated_at=datetime.now()
-                        )
-                        return True, wg_client, "Client created successfully"
-                    else:
-                        return False, None, "Client creation failed"
-                elif response.status_code == 401:
-                    # Re-authenticate and try again
-                    if self._authenticate():
-                        response = session.post(f"{self.panel_url}/api/wireguard/client", json=create_data)
-                        if response.status_code == 200:
-                            response_data = response.json()
-                            if response_data.get("success"):
-                                return True, None, "Client created successfully after re-auth"
-                    return False, None, "Re-authentication failed"
+                    # If we can't find the client in the list, create a basic response
+                    wg_client = WgEasyClient(
+                        id="unknown",
+                        name=unique_name,
+                        enabled=True,
+                        address="",
+                        public_key="",
+                        created_at=now,
+                        updated_at=now
+                    )
+                    return True, wg_client, "Client created successfully"
                 else:
-                    return False, None, f"Failed to create client: HTTP {response.status_code}"
-                    
-            except Exception as e:
-                logger.error(f"Error creating client: {e}")
-                return False, None, f"Error creating client: {str(e)}"
+                    return False, None, "Client creation failed"
+            elif status == 401:
+                return False, None, "Authentication failed"
+            else:
+                return False, None, f"Failed to create client: HTTP {status}"
                 
         except Exception as e:
             logger.error(f"Error creating client: {e}")
             return False, None, f"Error creating client: {str(e)}"
     
-    def delete_client(self, client_id: str) -> Tuple[bool, str]:
+    async def delete_client(self, client_id: str) -> Tuple[bool, str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, "Authentication failed"
-            
-            session = self._get_sync_session()
-            response = session.delete(f"{self.panel_url}/api/wireguard/client/{client_id}")
+            status, body = await self._request("DELETE", f"/api/wireguard/client/{client_id}")
             
-            if response.status_code == 200:
-                response_data = response.json()
+            if status == 200:
+                response_data = json.loads(body)
                 if response_data.get("success"):
                     logger.info(f"Deleted WireGuard client: {client_id}")
                     return True, "Client deleted successfully"
                 else:
                     return False, "Client deletion failed"
-            elif response.status_code == 404:
+            elif status == 404:
                 return False, "Client not found"
-            elif response.status_code == 401:
-                self.authenticated = False
-                if self._authenticate():
-                    response = session.delete(f"{self.panel_url}/api/wireguard/client/{client_id}")
-                    if response.status_code == 200:
-                        return True, "Client deleted successfully after re-auth"
+            elif status == 401:
                 return False, "Authentication failed"
             else:
-                return False, f"Failed to delete client: HTTP {response.status_code}"
+                return False, f"Failed to delete client: HTTP {status}"
                 
         except Exception as e:
             logger.error(f"Error deleting client {client_id}: {e}")
             return False, f"Error deleting client: {str(e)}"
     
-    def get_client_config(self, client_id: str) -> Tuple[bool, Optional[str], str]:
+    async def get_client_config(self, client_id: str) -> Tuple[bool, Optional[str], str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, None, "Authentication failed"
+            status, body = await self._request("GET", f"/api/wireguard/client/{client_id}/configuration")
             
-            session = self._get_sync_session()
-            response = session.get(f"{self.panel_url}/api/wireguard/client/{client_id}/configuration")
-            
-            if response.status_code == 200:
-                config_content = response.text
-                return True, config_content, "Configuration retrieved successfully"
-            elif response.status_code == 404:
+            if status == 200:
+                return True, body, "Configuration retrieved successfully"
+            elif status == 404:
                 return False, None, "Client not found"
-            elif response.status_code == 401:
-                self.authenticated = False
-                if self._authenticate():
-                    response = session.get(f"{self.panel_url}/api/wireguard/client/{client_id}/configuration")
-                    if response.status_code == 200:
-                        return True, response.text, "Configuration retrieved after re-auth"
+            elif status == 401:
                 return False, None, "Authentication failed"
             else:
-                return False, None, f"Failed to get config: HTTP {response.status_code}"
+                return False, None, f"Failed to get config: HTTP {status}"
                 
         except Exception as e:
             logger.error(f"Error getting config for client {client_id}: {e}")
             return False, None, f"Error getting config: {str(e)}"
     
-    def get_client_qr_code(self, client_id: str) -> Tuple[bool, Optional[str], str]:
+    async def get_client_qr_code(self, client_id: str) -> Tuple[bool, Optional[str], str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, None, "Authentication failed"
-            
-            session = self._get_sync_session()
-            response = session.get(f"{self.panel_url}/api/wireguard/client/{client_id}/qrcode")
+            status, body = await self._request("GET", f"/api/wireguard/client/{client_id}/qrcode")
             
-            if response.status_code == 200:
-                qr_data = response.text
-                return True, qr_data, "QR code retrieved successfully"
-            elif response.status_code == 404:
+            if status == 200:
+                return True, body, "QR code retrieved successfully"
+            elif status == 404:
                 return False, None, "Client not found"
-            elif response.status_code == 401:
-                self.authenticated = False
-                if self._authenticate():
-                    response = session.get(f"{self.panel_url}/api/wireguard/client/{client_id}/qrcode")
-                    if response.status_code == 200:
-                        return True, response.text, "QR code retrieved after re-auth"
+            elif status == 401:
                 return False, None, "Authentication failed"
             else:
-                return False, None, f"Failed to get QR code: HTTP {response.status_code}"
+                return False, None, f"Failed to get QR code: HTTP {status}"
                 
         except Exception as e:
             logger.error(f"Error getting QR code for client {client_id}: {e}")
             return False, None, f"Error getting QR code: {str(e)}"
     
-    def list_clients(self) -> Tuple[bool, List[WgEasyClient], str]:
+    async def list_clients(self) -> Tuple[bool, List[WgEasyClient], str]:
+        """All panel clients; callers that overlap share a single panel request"""
+        if self._list_request is None or self._list_request.done():
+            self._list_request = asyncio.ensure_future(self._fetch_clients())
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(self._list_request)
+    
+    async def _fetch_clients(self) -> Tuple[bool, List[WgEasyClient], str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, [], "Authentication failed"
-            
-            session = self._get_sync_session()
+            status, body = await self._request("GET", "/api/wireguard/client")
             
-            try:
-                response = session.get(f"{self.panel_url}/api/wireguard/client")
+            if status == 200:
+                clients_data = json.loads(body)
                 
-                if response.status_code == 200:
-                    clients_data = response.json()
-                    clients = []
-                    
-                    # Handle list response
-                    if isinstance(clients_data, list):
-                        data_list = clients_data
-                    else:
-                        return False, [], "Unexpected response format"
-                    
-                    for client_data in data_list:
-                        wg_client = WgEasyClient(
-                            id=client_data.get('id', ''),
-                            name=client_data.get('name', ''),
-                            enabled=client_data.get('enabled', True),
-                            address=client_data.get('address', ''),
-                            public_key=client_data.get('publicKey', ''),
-                            created_at=datetime.now(),
-                            updated_at=datetime.now()
-                        )
-                        clients.append(wg_client)
-                    
-                    return True, clients, f"Found {len(clients)} clients"
-                elif response.status_code == 401:
-                    # Re-authenticate and try again
-                    if self._authenticate():
-                        response = session.get(f"{self.panel_url}/api/wireguard/client")
-                        if response.status_code == 200:
-                            # Repeat the parsing logic
-                            clients_data = response.json()
-                            clients = []
-                            for client_data in clients_data:
-                                wg_client = WgEasyClient(
-                                    id=client_data.get('id', ''),
-                                    name=client_data.get('name', ''),
-                                    enabled=client_data.get('enabled', True),
-                                    address=client_data.get('address', ''),
-                                    public_key=client_data.get('publicKey', ''),
-                                    created_at=datetime.now(),
-                                    updated_at=datetime.now()
-                                )
-                                clients.append(wg_client)
-                            return True, clients, f"Found {len(clients)} clients after re-auth"
-                    return False, [], "Re-authentication failed"
-                else:
-                    return False, [], f"Failed to list clients: HTTP {response.status_code}"
-                    
-            except Exception as e:
-                logger.error(f"Error in list_clients: {e}")
-                return False, [], f"Error listing clients: {str(e)}"
+                # Handle list response
+                if not isinstance(clients_data, list):
+                    return False, [], "Unexpected response format"
+                
+                # One timestamp for the whole listing rather than two per client
+                now = datetime.now()
+                clients = [self._parse_client(client_data, now) for client_data in clients_data]
+                return True, clients, f"Found {len(clients)} clients"
+            elif status == 401:
+                return False, [], "Authentication failed"
+            else:
+                return False, [], f"Failed to list clients: HTTP {status}"
                 
         except Exception as e:
             logger.error(f"Error listing clients: {e}")
             return False, [], f"Error listing clients: {str(e)}"
     
-    def enable_client(self, client_id: str) -> Tuple[bool, str]:
+    async def enable_client(self, client_id: str) -> Tuple[bool, str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, "Authentication failed"
+            status, _ = await self._request("POST", f"/api/wireguard/client/{client_id}/enable")
             
-            session = self._get_sync_session()
-            response = session.post(f"{self.panel_url}/api/wireguard/client/{client_id}/enable")
-            
-            if response.status_code == 204:
+            if status == 204:
                 return True, "Client enabled successfully"
-            elif response.status_code == 404:
+            elif status == 404:
                 return False, "Client not found"
+            elif status == 401:
+                return False, "Authentication failed"
             else:
-                return False, f"Failed to enable client: HTTP {response.status_code}"
+                return False, f"Failed to enable client: HTTP {status}"
                 
         except Exception as e:
             return False, f"Error enabling client: {str(e)}"
     
-    def disable_client(self, client_id: str) -> Tuple[bool, str]:
+    async def disable_client(self, client_id: str) -> Tuple[bool, str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, "Authentication failed"
+            status, _ = await self._request("POST", f"/api/wireguard/client/{client_id}/disable")
             
-            session = self._get_sync_session()
-            response = session.post(f"{self.panel_url}/api/wireguard/client/{client_id}/disable")
-            
-            if response.status_code == 204:
+            if status == 204:
                 return True, "Client disabled successfully"
-            elif response.status_code == 404:
+            elif status == 404:
                 return False, "Client not found"
+            elif status == 401:
+                return False, "Authentication failed"
             else:
-                return False, f"Failed to disable client: HTTP {response.status_code}"
+                return False, f"Failed to disable client: HTTP {status}"
                 
         except Exception as e:
             return False, f"Error disabling client: {str(e)}"
     
-    def get_server_info(self) -> Tuple[bool, Dict, str]:
+    async def get_server_info(self) -> Tuple[bool, Dict, str]:
         try:
-            if not self.authenticated:
-                if not self._authenticate():
-                    return False, {}, "Authentication failed"
-            
-            session = self._get_sync_session()
-            response = session.get(f"{self.panel_url}/api/wireguard/server")
-            
-            if response.status_code == 200:
-                server_info = response.json()
-                return True, server_info, "Server info retrieved successfully"
-            elif response.status_code == 401:
-                self.authenticated = False
+            status, body = await self._request("GET", "/api/wireguard/server")
+            
+            if status == 200:
+                return True, json.loads(body), "Server info retrieved successfully"
+            elif status == 401:
                 return False, {}, "Authentication failed"
             else:
-                return False, {}, f"Failed to get server info: HTTP {response.status_code}"
+                return False, {}, f"Failed to get server info: HTTP {status}"
                 
         except Exception as e:
             logger.error(f"Error getting server info: {e}")
@@ -382,30 +338,39 @@ class DynamicTunnelManager:
     def __init__(self, wg_manager: WgEasyManager):
         self.wg_manager = wg_manager
         self.active_tunnels: Dict[int, str] = {}
+        # Weak values: a user's lock disappears once no request holds it
+        self._user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
         self.tunnel_cleanup_delay = 300
         
+    def user_lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_id] = lock
+        return lock
+    
     async def create_user_tunnel(self, user_id: int, username: str) -> Tuple[bool, Optional[Dict], str]:
         try:
             if user_id in self.active_tunnels:
                 existing_client_id = self.active_tunnels[user_id]
-                success, clients, _ = self.wg_manager.list_clients()
+                success, clients, _ = await self.wg_manager.list_clients()
                 if success and any(c.id == existing_client_id for c in clients):
                     return False, None, "User already has an active tunnel"
                 else:
                     del self.active_tunnels[user_id]
             
             client_name = f"user_{username}_{user_id}"
-            success, client, message = self.wg_manager.create_client(client_name)
+            success, client, message = await self.wg_manager.create_client(client_name)
             
             if not success:
                 return False, None, message
             
-            config_success, config_content, config_msg = self.wg_manager.get_client_config(client.id)
+            config_success, config_content, config_msg = await self.wg_manager.get_client_config(client.id)
             if not config_success:
-                self.wg_manager.delete_client(client.id)
+                await self.wg_manager.delete_client(client.id)
                 return False, None, f"Failed to get configuration: {config_msg}"
             
-            qr_success, qr_code, qr_msg = self.wg_manager.get_client_qr_code(client.id)
+            qr_success, qr_code, qr_msg = await self.wg_manager.get_client_qr_code(client.id)
             
             self.active_tunnels[user_id] = client.id
             
@@ -434,7 +399,7 @@ class DynamicTunnelManager:
             
             client_id = self.active_tunnels[user_id]
             
-            success, message = self.wg_manager.delete_client(client_id)
+            success, message = await self.wg_manager.delete_client(client_id)
             
             if success:
                 del self.active_tunnels[user_id]
@@ -450,6 +415,23 @@ class DynamicTunnelManager:
             logger.error(f"Error destroying tunnel for user {user_id}: {e}")
             return False, f"Error destroying tunnel: {str(e)}"
     
+    async def destroy_many(self, user_ids: List[int]) -> List[int]:
+        """Destroy several users' tunnels concurrently; returns the users left without one"""
+        semaphore = asyncio.Semaphore(BULK_DELETE_CONCURRENCY)
+        
+        async def destroy(user_id: int) -> Tuple[bool, str]:
+            async with semaphore:
+                result = await self.destroy_user_tunnel(user_id)
+                await asyncio.sleep(BULK_DELETE_PACING)
+                return result
+        
+        results = await asyncio.gather(*(destroy(user_id) for user_id in user_ids))
+        
+        return [
+            user_id for user_id, (success, message) in zip(user_ids, results)
+            if success or "no active tunnel" in message.lower()
+        ]
+    
     async def get_user_tunnel_status(self, user_id: int) -> Tuple[bool, Optional[Dict], str]:
         try:
             if user_id not in self.active_tunnels:
@@ -457,7 +439,7 @@ class DynamicTunnelManager:
             
             client_id = self.active_tunnels[user_id]
             
-            success, clients, message = self.wg_manager.list_clients()
+            success, clients, message = await self.wg_manager.list_clients()
             if not success:
                 return False, None, f"Error checking tunnel status: {message}"
             
@@ -487,7 +469,7 @@ class DynamicTunnelManager:
             if not self.active_tunnels:
                 return 0
             
-            success, clients, _ = self.wg_manager.list_clients()
+            success, clients, _ = await self.wg_manager.list_clients()
             if not success:
                 logger.error("Failed to get client list for cleanup")
                 return 0
@@ -528,7 +510,7 @@ class DynamicTunnelManager:
 #         )
         
 #         print("Testing connection to wg-easy panel...")
-#         success, message = wg_manager.test_connection()
+#         success, message = await wg_manager.test_connection()
 #         print(f"Connection test: {'✅ PASS' if success else '❌ FAIL'} - {message}")
         
 #         if not success: